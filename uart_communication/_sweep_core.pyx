@@ -0,0 +1,161 @@
+# cython: language_level=3, boundscheck=False, wraparound=False
+"""
+Compiled inner loop for pipelined DAC sweeps (POSIX only).
+
+Writes pre-encoded binary frames straight to the serial port's file descriptor,
+consumes the MCU's credit acks and paces the steps against CLOCK_MONOTONIC, all
+without the GIL, so a step costs a write() and no Python bytecode.
+
+Build in place with:
+    cythonize -i _sweep_core.pyx
+
+uart_com uses it when it imports; without it the sweeps run the same frames
+through the Python loop.
+"""
+from libc.errno cimport errno, EAGAIN, EINTR
+from libc.string cimport memcmp
+
+
+cdef extern from "<time.h>" nogil:
+    ctypedef long time_t
+    struct timespec:
+        time_t tv_sec
+        long tv_nsec
+    int CLOCK_MONOTONIC
+    int TIMER_ABSTIME
+    int clock_gettime(int clk_id, timespec *tp)
+    int clock_nanosleep(int clk_id, int flags, const timespec *request, timespec *remain)
+
+cdef extern from "<poll.h>" nogil:
+    struct pollfd:
+        int fd
+        short events
+        short revents
+    short POLLIN
+    short POLLOUT
+    int poll(pollfd *fds, unsigned long nfds, int timeout)
+
+cdef extern from "<unistd.h>" nogil:
+    ssize_t write(int fd, const void *buf, size_t count)
+    ssize_t read(int fd, void *buf, size_t count)
+
+
+cdef inline double _now() noexcept nogil:
+    cdef timespec ts
+    clock_gettime(CLOCK_MONOTONIC, &ts)
+    return ts.tv_sec + ts.tv_nsec * 1e-9
+
+
+cdef inline void _sleep_until(double t) noexcept nogil:
+    cdef timespec ts
+    ts.tv_sec = <time_t>t
+    ts.tv_nsec = <long>((t - ts.tv_sec) * 1e9)
+    while clock_nanosleep(CLOCK_MONOTONIC, TIMER_ABSTIME, &ts, NULL) == EINTR:
+        pass
+
+
+cdef int _write_all(int fd, const unsigned char *p, Py_ssize_t n) noexcept nogil:
+    """Write n bytes to a non-blocking fd; returns 0, or the errno on failure."""
+    cdef ssize_t w
+    cdef pollfd pfd
+    pfd.fd = fd
+    pfd.events = POLLOUT
+    while n > 0:
+        w = write(fd, p, n)
+        if w > 0:
+            p += w
+            n -= w
+        elif w < 0 and errno == EINTR:
+            continue
+        elif w < 0 and errno != EAGAIN:
+            return errno
+        else:
+            # Transmit buffer full: wait for room
+            poll(&pfd, 1, -1)
+    return 0
+
+
+cdef int _read_ack(int fd, const unsigned char *ack, Py_ssize_t n, double timeout) noexcept nogil:
+    """Read exactly n bytes and compare them with ack; returns 1 if they match."""
+    cdef unsigned char buf[32]
+    cdef Py_ssize_t got = 0
+    cdef ssize_t r
+    cdef double deadline = _now() + timeout
+    cdef double remaining
+    cdef pollfd pfd
+    pfd.fd = fd
+    pfd.events = POLLIN
+    if n > 32:
+        return 0
+    while got < n:
+        r = read(fd, buf + got, n - got)
+        if r > 0:
+            got += r
+            continue
+        if r < 0 and errno == EINTR:
+            continue
+        if r < 0 and errno != EAGAIN:
+            return 0
+        remaining = deadline - _now()
+        if remaining <= 0 or poll(&pfd, 1, <int>(remaining * 1000) + 1) <= 0:
+            return 0
+    return memcmp(buf, ack, n) == 0
+
+
+def stream_frames(int fd, const unsigned char[::1] buf, Py_ssize_t size, holds,
+                  int unacked, int credit, const unsigned char[::1] ack, double timeout=2.0):
+    """
+    Write the frames in buf to fd, consuming a credit ack whenever the window fills.
+
+    Args:
+        fd (int): File descriptor of the open (non-blocking) serial port
+        buf: Contiguous frames, size bytes each
+        size (int): Bytes per frame
+        holds: Seconds to hold each frame (NumPy float64 array), or None to
+            send unpaced, a whole credit window per write
+        unacked (int): Commands already sent in the current credit window
+        credit (int): Commands per credit ack
+        ack: Expected credit ack bytes
+        timeout (float): Timeout in seconds when waiting for a credit ack
+
+    Returns:
+        tuple: (unacked, bad_acks) - the new window count and how many acks
+            were missing or corrupted (the window restarts either way)
+    """
+    cdef Py_ssize_t count = buf.shape[0] // size
+    cdef const double[::1] hold
+    cdef bint paced = holds is not None
+    cdef Py_ssize_t i = 0, n
+    cdef int bad = 0, err = 0
+    cdef double deadline, remaining
+    if paced:
+        hold = holds
+        if hold.shape[0] < count:
+            raise ValueError("holds must have one entry per frame")
+
+    with nogil:
+        deadline = _now()
+        while i < count:
+            n = 1 if paced else min(credit - unacked, count - i)
+            err = _write_all(fd, &buf[i * size], n * size)
+            if err:
+                break
+            i += n
+            unacked += n
+            if unacked >= credit:
+                if not _read_ack(fd, &ack[0], ack.shape[0], timeout):
+                    bad += 1
+                unacked = 0
+            if paced:
+                # Same schedule as DACController._wait_step, resyncing when
+                # more than one period behind instead of bursting to catch up
+                deadline += hold[i - 1]
+                remaining = deadline - _now()
+                if remaining > 0:
+                    _sleep_until(deadline)
+                elif hold[i - 1] > 0 and remaining < -hold[i - 1]:
+                    deadline = _now()
+
+    if err:
+        raise OSError(err, "write to serial port failed")
+    return unacked, bad
@@ -1,25 +1,105 @@
+import logging
+import math
 import pyvisa
 import numpy as np
-from time import sleep
+from pyvisa.constants import StatusCode
+from pyvisa.errors import VisaIOError
+from time import sleep, monotonic
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+# Shared ResourceManager; creating one scans the VISA backends and can take seconds
+_RM = None
+
+
+def _rm() -> pyvisa.ResourceManager:
+    global _RM
+    if _RM is None:
+        _RM = pyvisa.ResourceManager()
+    return _RM
+
+
+def _instr_addr(socket_addr: str) -> str | None:
+    """Map TCPIP::host::port::SOCKET to the VXI-11 TCPIP::host::INSTR resource."""
+    parts = socket_addr.split("::")
+    if len(parts) == 4 and parts[0].upper().startswith("TCPIP") and parts[3].upper() == "SOCKET":
+        return f"{parts[0]}::{parts[1]}::INSTR"
+    return None
 
 
 class KeysightOPM:
     def __init__(self, visa_addr: str):
-        self.rm = pyvisa.ResourceManager()
-        self.inst = self.rm.open_resource(visa_addr)
+        """
+        Open the power meter at visa_addr.
+
+        A raw SCPI socket (e.g. "TCPIP::host::5025::SOCKET") avoids the VXI-11
+        RPC round-trips that every INSTR query pays. It has no SRQ or device
+        clear, which polling the power meter doesn't use. If the socket is
+        refused, the matching TCPIP::host::INSTR resource is opened instead.
+        """
+        self.rm = _rm()
+        try:
+            self.inst = self.rm.open_resource(visa_addr, open_timeout=2000)
+        except (VisaIOError, OSError) as e:
+            fallback = _instr_addr(visa_addr)
+            if fallback is None:
+                raise
+            logger.debug("%s: %s; falling back to %s", visa_addr, e, fallback)
+            self.inst = self.rm.open_resource(fallback, open_timeout=2000)
+        # Required for SOCKET, which has no EOI to mark the end of a message
         self.inst.read_termination = "\n"
         self.inst.write_termination = "\n"
-        # Increase timeout to handle slow channels (default is often 5 seconds)
-        self.inst.timeout = 10000  # 10 seconds in milliseconds
-        self.id = self.query("*IDN?").strip()
+        # Long enough for slow channels; a failed read costs the full timeout,
+        # so keep it well below the 10 s that was used before
+        self.inst.timeout = 2000  # 2 seconds in milliseconds
+        # Large enough for a binary all-channel read to arrive in one chunk
+        self.inst.chunk_size = 65536
+        # Channel settings cache: (getter name, chan) -> (timestamp, value)
+        self._cache: dict[tuple[str, int], tuple[float, Any]] = {}
+        self._cache_ttl = 0.5  # seconds; short enough to notice front-panel edits
+        # Units set through this driver, and the originals get_power_mw replaced
+        self._unit_cache: dict[int, str] = {}
+        self._orig_units: dict[int, str] = {}
+        
+        # Identify the instrument and ask for its channel count in one round-trip
+        try:
+            resp = self.query("*IDN?;:SYST:CHAN:COUN?").split(";")
+        except VisaIOError as e:
+            logger.debug("*IDN?;:SYST:CHAN:COUN?: %s", e)
+            resp = [self.query("*IDN?")]
+        self.id = resp[0].strip()
         
-        # Detect number of channels based on device model
-        if "N7745" in self.id or "N7744" in self.id:
-            self.max_chan = 8  # N7745C/N7744C are 8-channel
-        elif "MY61C00155" in self.id:
-            self.max_chan = 4
-        else:
-            self.max_chan = 2  # Default for most 2-channel models
+        try:
+            self.max_chan = int(resp[1])
+        except (IndexError, ValueError):
+            # Channel count query not supported; clear the error it left behind
+            self.write("*CLS")
+            # Detect number of channels based on device model
+            if "N7745" in self.id or "N7744" in self.id:
+                self.max_chan = 8  # N7745C/N7744C are 8-channel
+            elif "MY61C00155" in self.id:
+                self.max_chan = 4
+            else:
+                self.max_chan = 2  # Default for most 2-channel models
+        
+        # Reused by every get_power_all() call instead of building a new list
+        self._power_buf = np.empty(self.max_chan, dtype=np.float32)
+        # Cleared once the instrument fails the binary read:pow:all?
+        self._has_binary_read_all = True
+        # Channel -> monotonic() time its logging started by start_logging() should finish
+        self._logging_end: dict[int, float] = {}
+        
+        # SCPI strings for every channel, formatted once; index 0 is unused
+        chans = range(1, self.max_chan + 1)
+        self._read_pow_cmds = [None] + [f"read{c}:pow?" for c in chans]
+        self._sens_cmds = [None] + [f"sens{c}" for c in chans]
+        self._unit_cmds = [None] + [f"sens{c}:pow:unit?" for c in chans]
+        self._wav_cmds = [None] + [f"sens{c}:pow:wav?" for c in chans]
+        self._auto_range_cmds = [None] + [f"sens{c}:pow:rang:auto?" for c in chans]
+        self._range_cmds = [None] + [f"sens{c}:pow:rang?" for c in chans]
+        # ";:" resets the SCPI command tree between the chained queries
+        self._read_pow_all_cmd = ";:".join(self._read_pow_cmds[1:])
 
     def write(self, cmd: str):
         self.inst.write(cmd)
@@ -30,104 +110,260 @@ class KeysightOPM:
     def read_binary(self, datatype="f"):
         return self.inst.read_binary_values(datatype=datatype)
 
-    def _check_channel(self, chan: int) -> bool:
-        return 1 <= chan <= self.max_chan
+    def _cmd(self, table: list, chan: int) -> str:
+        """Look up a channel's precomputed command; out-of-range channels raise IndexError."""
+        if not 1 <= chan <= self.max_chan:
+            raise IndexError(f"OPM channel {chan} out of range 1-{self.max_chan}")
+        return table[chan]
+
+    def _cache_get(self, name: str, chan: int):
+        entry = self._cache.get((name, chan))
+        if entry is not None and monotonic() - entry[0] < self._cache_ttl:
+            return entry[1]
+        return None
+
+    def _cache_put(self, name: str, chan: int, value):
+        self._cache[(name, chan)] = (monotonic(), value)
+        return value
+
+    def _cache_invalidate(self, chan: int, *names: str):
+        for name in names:
+            self._cache.pop((name, chan), None)
 
     def set_unit(self, chan: int, unit: str):
-        if not self._check_channel(chan): return
+        sens = self._cmd(self._sens_cmds, chan)
+        self._cache_invalidate(chan, "get_unit")
         if unit.lower() == "dbm":
-            self.write(f"sens{chan}:pow:unit 0")
+            self.write(f"{sens}:pow:unit 0")
+            self._unit_cache[chan] = "dBm"
         elif unit.lower() in ("watt", "w"):
-            self.write(f"sens{chan}:pow:unit 1")
+            self.write(f"{sens}:pow:unit 1")
+            self._unit_cache[chan] = "Watt"
 
     def get_unit(self, chan: int) -> str:
-        if not self._check_channel(chan): return "Invalid"
+        cmd = self._cmd(self._unit_cmds, chan)
+        cached = self._cache_get("get_unit", chan)
+        if cached is not None: return cached
         try:
-            unit_code = int(self.query(f"sens{chan}:pow:unit?"))
-            return "dBm" if unit_code == 0 else "Watt"
-        except:
+            unit_code = int(self.query(cmd))
+            return self._cache_put("get_unit", chan, "dBm" if unit_code == 0 else "Watt")
+        except (VisaIOError, ValueError) as e:
+            logger.debug("%s ch%d: %s", cmd, chan, e)
             return "dBm"  # Default assumption
 
     def set_wavelength(self, chan: int, wavel: float):
-        if not self._check_channel(chan): return
-        self.write(f"sens{chan}:pow:wav {wavel}nm")
+        sens = self._cmd(self._sens_cmds, chan)
+        self._cache_invalidate(chan, "get_wavelength")
+        self.write(f"{sens}:pow:wav {wavel}nm")
 
     def get_wavelength(self, chan: int) -> float:
-        if not self._check_channel(chan): return 0.0
+        cmd = self._cmd(self._wav_cmds, chan)
+        cached = self._cache_get("get_wavelength", chan)
+        if cached is not None: return cached
         try:
-            return float(self.query(f"sens{chan}:pow:wav?")) * 1e9
-        except:
+            return self._cache_put("get_wavelength", chan, float(self.query(cmd)) * 1e9)
+        except (VisaIOError, ValueError) as e:
+            logger.debug("%s ch%d: %s", cmd, chan, e)
             return 0.0
 
     def set_auto_range(self, chan: int, state: bool):
-        if not self._check_channel(chan): return
-        self.write(f"sens{chan}:pow:rang:auto {1 if state else 0}")
+        sens = self._cmd(self._sens_cmds, chan)
+        self._cache_invalidate(chan, "is_auto_range", "get_range")
+        self.write(f"{sens}:pow:rang:auto {1 if state else 0}")
 
     def is_auto_range(self, chan: int) -> bool:
-        if not self._check_channel(chan): return False
+        cmd = self._cmd(self._auto_range_cmds, chan)
+        cached = self._cache_get("is_auto_range", chan)
+        if cached is not None: return cached
         try:
-            return bool(int(self.query(f"sens{chan}:pow:rang:auto?")))
-        except:
+            return self._cache_put("is_auto_range", chan, bool(int(self.query(cmd))))
+        except (VisaIOError, ValueError) as e:
+            logger.debug("%s ch%d: %s", cmd, chan, e)
             return False
 
     def set_range(self, chan: int, pwr_range: float | str):
-        if not self._check_channel(chan): return
+        sens = self._cmd(self._sens_cmds, chan)
         if isinstance(pwr_range, str) and pwr_range.lower() == "auto":
             self.set_auto_range(chan, True)
             return
         self.set_auto_range(chan, False)
-        self.write(f"sens{chan}:pow:rang {float(pwr_range)}dbm")
+        self._cache_invalidate(chan, "get_range")
+        self.write(f"{sens}:pow:rang {float(pwr_range)}dbm")
 
     def get_range(self, chan: int) -> str:
-        if not self._check_channel(chan): return "Invalid"
-        if self.is_auto_range(chan): return "Auto"
+        cmd = self._cmd(self._range_cmds, chan)
+        cached = self._cache_get("get_range", chan)
+        if cached is not None: return cached
+        if self.is_auto_range(chan): return self._cache_put("get_range", chan, "Auto")
         try:
-            return f"{float(self.query(f'sens{chan}:pow:rang?'))} dBm"
-        except:
+            return self._cache_put("get_range", chan, f"{float(self.query(cmd))} dBm")
+        except (VisaIOError, ValueError) as e:
+            logger.debug("%s ch%d: %s", cmd, chan, e)
             return "Error"
 
     def get_power(self, chan: int, retries: int = 2) -> float | None:
         """Measure the optical power on a specific channel in the current unit."""
-        if not self._check_channel(chan):
-            return None
+        # Use standard command format that works across Keysight models
+        # Format: read{chan}:pow? (matches working implementation)
+        cmd = self._cmd(self._read_pow_cmds, chan)
         
         # Retry logic for channels that timeout
         for attempt in range(retries + 1):
             try:
-                # Use standard command format that works across Keysight models
-                # Format: read{chan}:pow? (matches working implementation)
-                p = float(self.query(f"read{chan}:pow?"))
+                p = float(self.query(cmd))
                 return p
-            except:
-                # If it's the last attempt, return None
-                if attempt == retries:
+            except VisaIOError as e:
+                logger.debug("%s ch%d (attempt %d): %s", cmd, chan, attempt + 1, e)
+                # Only a timeout is worth retrying; other errors (e.g. a locked
+                # resource) will not clear up by asking again
+                if e.error_code != StatusCode.error_timeout or attempt == retries:
                     return None
                 # Otherwise, wait a bit and retry
                 sleep(0.1)
+            except ValueError as e:
+                logger.debug("%s ch%d: %s", cmd, chan, e)
+                return None
         return None
 
     def get_power_mw(self, chan: int) -> float | None:
-        if not self._check_channel(chan): return None
-        orig_unit = self.get_unit(chan)
-        if orig_unit == "dBm":
+        """
+        Measure the optical power on a specific channel in milliwatts.
+        The channel is switched to Watt on first use and left there, so repeated
+        calls cost a single query. Call restore_units() to put the original
+        units back.
+        """
+        unit = self._unit_cache.get(chan) or self.get_unit(chan)
+        if unit != "Watt":
+            self._orig_units.setdefault(chan, unit)
             self.set_unit(chan, "Watt")
-            sleep(0.05)
+            try:
+                self.query("*OPC?")  # Returns once the unit change has taken effect
+            except VisaIOError as e:
+                logger.debug("*OPC? ch%d: %s", chan, e)
         val = self.get_power(chan)
-        if orig_unit == "dBm":
-            self.set_unit(chan, "dBm")
         return val * 1000 if val is not None else None
 
-    def get_power_all(self) -> list[float]:
+    def get_power_both(self, chan: int) -> tuple[float | None, float | None]:
+        """
+        Measure the optical power on a specific channel once and return it as
+        (milliwatts, dBm). dBm is derived from the same reading rather than read
+        again; it is None for a reading <= 0, and both are None if the read failed.
+        """
+        mw = self.get_power_mw(chan)
+        if mw is None:
+            return None, None
+        # Plain float math: a NumPy ufunc call on one scalar costs more than the log itself
+        return mw, (10 * math.log10(mw) if mw > 0 else None)
+
+    def restore_units(self):
+        """Restore the units that get_power_mw switched to Watt."""
+        for chan, unit in self._orig_units.items():
+            self.set_unit(chan, unit)
+        self._orig_units.clear()
+
+    def start_logging(self, chan: int, n_samples: int, avg_time_s: float) -> bool:
+        """
+        Start the instrument's logging function: n_samples consecutive readings,
+        each averaged over avg_time_s, on its own timebase. Collect them with
+        fetch_logging(). Returns False if the instrument rejected the setup.
+        """
+        sens = self._cmd(self._sens_cmds, chan)
+        try:
+            self.write(f"{sens}:func:par:logg {n_samples},{avg_time_s}s")
+            self.write(f"{sens}:func:stat logg,star")
+            self._logging_end[chan] = monotonic() + n_samples * avg_time_s
+            return True
+        except VisaIOError as e:
+            logger.debug("logging ch%d: %s", chan, e)
+            return False
+
+    def fetch_logging(self, chan: int, poll_s: float = 0.01, timeout: float = 2.0) -> np.ndarray | None:
+        """
+        Wait for logging started by start_logging() to complete, fetch the
+        readings as one binary block (Watt) and stop the logging function.
+        Returns None if the meter hasn't reported completion timeout seconds
+        after the logging should have finished.
+        """
+        sens = self._cmd(self._sens_cmds, chan)
+        deadline = self._logging_end.pop(chan, monotonic()) + timeout
+        try:
+            while "COMPLETE" not in self.query(f"{sens}:func:stat?").upper():
+                if monotonic() > deadline:
+                    logger.debug("logging ch%d: not complete after %.1f s past its end", chan, timeout)
+                    return None
+                sleep(poll_s)
+            return self.inst.query_binary_values(f"{sens}:func:res?", datatype="f",
+                                                 is_big_endian=False, container=np.ndarray)
+        except VisaIOError as e:
+            logger.debug("logging ch%d: %s", chan, e)
+            return None
+        finally:
+            try:
+                self.write(f"{sens}:func:stat logg,stop")
+            except VisaIOError:
+                pass
+
+    def get_power_block(self, chan: int, n_samples: int, avg_time_s: float) -> np.ndarray | None:
+        """
+        Capture n_samples consecutive power readings inside the instrument (logging
+        function) and fetch them as one binary block, instead of one query per sample.
+        Values are in Watt.
+        """
+        if not self.start_logging(chan, n_samples, avg_time_s):
+            return None
+        # Nothing to poll for until the instrument could possibly be done
+        sleep(n_samples * avg_time_s)
+        return self.fetch_logging(chan, max(avg_time_s, 0.01))
+
+    def get_power_all(self) -> np.ndarray:
         """
         Measure the optical power on all available channels in their current units.
-        Uses individual channel reads for reliability (binary read can timeout).
+        Uses the binary read:pow:all? block transfer (4 bytes per channel, one
+        round-trip). Instruments that reject it (an error or a reply that isn't
+        a binary block of one value per channel) fall back to a compound ASCII
+        query, then to individual channel reads, and the binary read is not
+        tried again; a timeout only skips it for this call. Failed channels
+        read NaN.
+
+        The returned array is reused by the next call; use .copy() to keep a
+        snapshot.
         """
-        # Use individual channel reads - more reliable than binary read
-        # Binary read can timeout on some channels
-        results = []
+        buf = self._power_buf
+        if self._has_binary_read_all:
+            try:
+                results = self.inst.query_binary_values("read:pow:all?", datatype="f",
+                                                        is_big_endian=False, container=np.ndarray)
+                if len(results) == self.max_chan:
+                    buf[:] = results
+                    return buf
+                logger.debug("read:pow:all? returned %d values for %d channels", len(results), self.max_chan)
+                self._has_binary_read_all = False
+            except VisaIOError as e:
+                logger.debug("read:pow:all?: %s", e)
+                if e.error_code == StatusCode.error_timeout:
+                    # A late binary reply would otherwise be read as the next ASCII answer
+                    try:
+                        self.inst.clear()
+                    except VisaIOError as e:
+                        logger.debug("clear: %s", e)
+                else:
+                    # Rejected by the instrument: don't pay for it on every later call
+                    self._has_binary_read_all = False
+            except ValueError as e:
+                # Not an IEEE block, e.g. an ASCII error answer: unsupported here
+                logger.debug("read:pow:all?: %s", e)
+                self._has_binary_read_all = False
+
+        try:
+            raw = self.query(self._read_pow_all_cmd).split(";")
+            if len(raw) == self.max_chan:
+                buf[:] = [float(x) if x.strip() else np.nan for x in raw]
+                return buf
+        except (VisaIOError, ValueError):
+            pass
+
+        # Fallback: individual channel reads
         for ch in range(1, self.max_chan + 1):
             power = self.get_power(ch, retries=2)
-            results.append(power if power is not None else float("nan"))
-            # Small delay between channels to avoid overwhelming the instrument
-            sleep(0.05)
-        return results
\ No newline at end of file
+            buf[ch - 1] = power if power is not None else np.nan
+        return buf
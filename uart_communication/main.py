@@ -1,23 +1,37 @@
+import math
+
 import keysight_opm
 import uart_com
+from concurrent.futures import ThreadPoolExecutor
 from time import sleep
 
-# VISA resource string for Keysight OPM
-keysight_visa = 'TCPIP::129.82.224.199::INSTR'
+# VISA resource string for Keysight OPM (raw SCPI socket; falls back to ::INSTR)
+keysight_visa = 'TCPIP::129.82.224.199::5025::SOCKET'
 
 if __name__ == "__main__":
+    uart_com.raise_priority()  # Less scheduler jitter in the timed steps below
+    
+    # Single worker so the OPM session is only ever touched from one thread
+    opm_worker = ThreadPoolExecutor(max_workers=1)
     try:
         # Initialize OPM (doesn't use serial port)
         opm = keysight_opm.KeysightOPM(keysight_visa)
         print(f"Connected to OPM: {opm.id}\n")
         
-        # Initialize DAC controller
-        dac = uart_com.DACController(port="COM3", baud=115200, verbose=True)
+        # Open the port once; the DAC and ADC controllers share it
+        port = uart_com.open_port("COM3", 460800, timeout=1)
+        dac = uart_com.DACController(shared_port=port, verbose=True)
+        adc = uart_com.ADCController(shared_port=port,
+                                     shunt_resistors=[200.0, 200.0, 200.0, 200.0],
+                                     verbose=True)
+        dac.set_low_latency()  # Before the first handshake, so every round-trip benefits
+        dac.wait_until_ready()
+        dac.warm_up()  # So the first set_dac below isn't the slow one
         
         # Check communication
         if not dac.check_communication():
             print("Warning: DAC communication check failed.")
-            dac.close()
+            port.close()
             exit()
         
         # Set DAC channel 0
@@ -25,32 +39,20 @@ if __name__ == "__main__":
         print(f"Setting DAC channel 0 to {dac_value}...")
         dac.set_dac(0, dac_value)
         sleep(0.2)  # Wait for DAC to settle
-        
-        # Close DAC controller to free the serial port
-        dac.close()
-        sleep(0.5)  # Brief pause before reopening port
-        
-        # Initialize ADC controller (uses same port, so we need to close DAC first)
-        adc = uart_com.ADCController(port="COM3", baud=115200, 
-                                     shunt_resistors=[200.0, 200.0, 200.0, 200.0],
-                                     verbose=True)
-        
-        # Check communication
-        if not adc.check_communication():
-            print("Warning: ADC communication check failed.")
-            adc.close()
-            exit()
+
+        # Read the OPM in the background while the UART side keeps working
+        opm_future = opm_worker.submit(opm.get_power_all)
         
         # Read current from ADC channel 0
         print("\nReading current from ADC channel 0...")
         current = adc.read_current(0, verbose=True, timeout=3.0)
         
-        # Close ADC controller
-        adc.close()
+        # Close the shared serial port
+        port.close()
         
-        # Read power from OPM channel 1 (OPM uses 1-based indexing)
-        print("\nReading power from OPM channel 1...")
-        power = opm.get_power(1)
+        # Collect the OPM reading (OPM uses 1-based indexing, channel 1 is index 0)
+        print("\nCollecting power from OPM channel 1...")
+        power = opm_future.result()[0]
         unit = opm.get_unit(1)
         
         # Print results
@@ -62,10 +64,12 @@ if __name__ == "__main__":
             print(f"ADC Channel 0 Current: {current*1000:.3f} mA")
         else:
             print(f"ADC Channel 0 Current: N/A")
-        if power is not None:
+        if not math.isnan(power):  # NaN marks a failed channel read
             print(f"OPM Channel 1: {power:.6f} {unit}")
         else:
             print(f"OPM Channel 1: N/A")
                 
     except Exception as e:
-        print(f"Error: {e}")
\ No newline at end of file
+        print(f"Error: {e}")
+    finally:
+        opm_worker.shutdown(wait=False)
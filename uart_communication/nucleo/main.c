@@ -22,12 +22,43 @@ uint8_t tx_buffer[128];
 uint8_t rx_buffer[64];
 uint8_t rx_index = 0;
 
+// Interrupt-driven receive ring: bytes keep arriving while an I2C transfer or
+// a blocking transmit is in progress, which pipelined commands rely on
+#define RX_RING_SIZE 256
+volatile uint8_t rx_ring[RX_RING_SIZE];
+volatile uint8_t rx_head = 0;  // uint8_t indices wrap at RX_RING_SIZE
+volatile uint8_t rx_tail = 0;
+
+// Pipelined "pset" commands: one "ACK16" per PSET_CREDIT commands instead of one reply each
+#define PSET_CREDIT 16
+uint8_t pset_count = 0;
+uint16_t pset_errors = 0;
+
+// Binary frames start with BIN_SYNC, which never begins a text command.
+// SET_ONE:   sync, opcode, channel, little-endian uint16 value
+// SET_MULTI: sync, opcode, channel mask, four little-endian uint16 values
+// SET_ACK:   as SET_ONE, but answered with "1"/"0" like the text "channel,value" command
+// SET_MULTI_ACK: as SET_MULTI, answered with "1"/"0"
+#define BIN_SYNC            0xA5
+#define BIN_OP_SET_ONE      0x01
+#define BIN_OP_SET_MULTI    0x02
+#define BIN_OP_SET_ACK      0x03
+#define BIN_OP_SET_MULTI_ACK 0x04
+#define BIN_SET_ONE_LEN     5
+#define BIN_SET_MULTI_LEN   11
+uint8_t bin_len = 0;  // Length of the binary frame being received, 0 in text mode
+
+// Last value written to each DAC channel, so a frame can update some channels and keep the rest
+uint16_t dac_shadow[4] = {0, 0, 0, 0};
+
 void SystemClock_Config(void);
 static void MX_GPIO_Init(void);
 static void MX_I2C1_Init(void);
 static void MX_I2C2_Init(void);
 static void MX_USART2_UART_Init(void);
 void ProcessUARTCommand(void);
+void ProcessBinaryFrame(void);
+static void PipelinedDone(HAL_StatusTypeDef status);
 float ADS1115_ReadVoltage(uint8_t channel);
 
 int main(void)
@@ -81,16 +112,43 @@ int main(void)
     // Clear receive buffer
     memset(rx_buffer, 0, sizeof(rx_buffer));
     rx_index = 0;
+    
+    // Tell the host we are ready (it also polls with COMM_OK in case this is missed)
+    int banner_len = sprintf((char*)tx_buffer, "READY\r\n");
+    HAL_UART_Transmit(&huart2, tx_buffer, banner_len, 100);
 
     // Main loop: receive and process UART commands
     while (1)
     {
         uint8_t byte;
-        // Try to receive one byte (non-blocking)
-        if (HAL_UART_Receive(&huart2, &byte, 1, 10) == HAL_OK)
+        // Take one byte from the receive ring, if any
+        if (rx_tail != rx_head)
         {
+            byte = rx_ring[rx_tail++];
+            if (bin_len > 0)
+            {
+                // Binary frame: fixed length, so '\r' and '\n' are ordinary data bytes
+                rx_buffer[rx_index++] = byte;
+                if (rx_index == 2)
+                {
+                    bin_len = (byte == BIN_OP_SET_ONE || byte == BIN_OP_SET_ACK) ? BIN_SET_ONE_LEN :
+                              (byte == BIN_OP_SET_MULTI || byte == BIN_OP_SET_MULTI_ACK) ? BIN_SET_MULTI_LEN : 0;
+                    if (bin_len == 0) rx_index = 0;  // Unknown opcode, drop the frame
+                }
+                if (bin_len > 0 && rx_index >= bin_len)
+                {
+                    ProcessBinaryFrame();
+                    rx_index = 0;
+                    bin_len = 0;
+                }
+            }
+            else if (rx_index == 0 && byte == BIN_SYNC)
+            {
+                rx_buffer[rx_index++] = byte;
+                bin_len = 2;  // Real length is known once the opcode arrives
+            }
             // Check for newline or carriage return (end of command)
-            if (byte == '\n' || byte == '\r')
+            else if (byte == '\n' || byte == '\r')
             {
                 if (rx_index > 0)
                 {
@@ -177,7 +235,8 @@ static void MX_I2C2_Init(void)
 static void MX_USART2_UART_Init(void)
 {
     huart2.Instance = USART2;
-    huart2.Init.BaudRate = 115200;
+    // 460800 divides from the 16 MHz HSI with -0.8% error; 921600 would be off by 2.1%
+    huart2.Init.BaudRate = 460800;
     huart2.Init.WordLength = UART_WORDLENGTH_8B;
     huart2.Init.StopBits = UART_STOPBITS_1;
     huart2.Init.Parity = UART_PARITY_NONE;
@@ -186,6 +245,30 @@ static void MX_USART2_UART_Init(void)
     huart2.Init.OverSampling = UART_OVERSAMPLING_16;
 
     if (HAL_UART_Init(&huart2) != HAL_OK) Error_Handler();
+    
+    // Receive through the RXNE interrupt into rx_ring
+    HAL_NVIC_SetPriority(USART2_IRQn, 0, 0);
+    HAL_NVIC_EnableIRQ(USART2_IRQn);
+    __HAL_UART_ENABLE_IT(&huart2, UART_IT_RXNE);
+}
+
+/**
+  * @brief  USART2 interrupt: move the received byte into rx_ring
+  * @note   Reading SR then DR also clears an overrun flag
+  */
+void USART2_IRQHandler(void)
+{
+    uint32_t sr = huart2.Instance->SR;
+    if (sr & (USART_SR_RXNE | USART_SR_ORE))
+    {
+        uint8_t byte = (uint8_t)(huart2.Instance->DR & 0xFF);
+        uint8_t next = rx_head + 1;
+        if (next != rx_tail)  // Drop the byte if the ring is full
+        {
+            rx_ring[rx_head] = byte;
+            rx_head = next;
+        }
+    }
 }
 
 static void MX_GPIO_Init(void)
@@ -266,6 +349,61 @@ void ProcessUARTCommand(void)
         return;
     }
     
+    // Handle "read_adc_bin,channel" command - raw ADC value as an 8-byte binary frame:
+    // 0xAA, channel, int32 raw (little-endian), XOR of the previous 7 bytes
+    if (strncmp((char*)rx_buffer, "read_adc_bin,", 13) == 0)
+    {
+        uint8_t channel = (uint8_t)atoi((char*)rx_buffer + 13);
+        
+        if (adc_handle == NULL || channel > 3)
+        {
+            int len = sprintf((char*)tx_buffer, "ERROR\r\n");
+            HAL_UART_Transmit(&huart2, tx_buffer, len, 100);
+            return;
+        }
+        
+        ADS1115_MUX_t mux_settings[4] = {
+            ADS1115_MUX_AIN0_GND, ADS1115_MUX_AIN1_GND,
+            ADS1115_MUX_AIN2_GND, ADS1115_MUX_AIN3_GND
+        };
+        ADS1115_Config_t config = adc_handle->config;
+        config.channel = mux_settings[channel];
+        adc_handle->config = config;
+        
+        int32_t raw_adc = ADS1115_oneShotMeasure(adc_handle);
+        
+        tx_buffer[0] = 0xAA;
+        tx_buffer[1] = channel;
+        memcpy(&tx_buffer[2], &raw_adc, sizeof(raw_adc));  // Cortex-M is little-endian
+        tx_buffer[7] = 0;
+        for (int i = 0; i < 7; i++)
+        {
+            tx_buffer[7] ^= tx_buffer[i];
+        }
+        HAL_UART_Transmit(&huart2, tx_buffer, 8, 100);
+        return;
+    }
+    
+    // Handle "read_all" command - read all four ADC voltages in one reply "v0,v1,v2,v3"
+    if (strcmp((char*)rx_buffer, "read_all") == 0)
+    {
+        if (adc_handle == NULL)
+        {
+            int len = sprintf((char*)tx_buffer, "ERROR\r\n");
+            HAL_UART_Transmit(&huart2, tx_buffer, len, 100);
+            return;
+        }
+        
+        float v[4];
+        for (uint8_t ch = 0; ch < 4; ch++)
+        {
+            v[ch] = ADS1115_ReadVoltage(ch);
+        }
+        int len = sprintf((char*)tx_buffer, "%.4f,%.4f,%.4f,%.4f\r\n", v[0], v[1], v[2], v[3]);
+        HAL_UART_Transmit(&huart2, tx_buffer, len, 100);
+        return;
+    }
+    
     // Handle "read_adc,channel" command - read ADC voltage
     if (strncmp((char*)rx_buffer, "read_adc,", 9) == 0)
     {
@@ -287,6 +425,35 @@ void ProcessUARTCommand(void)
         return;
     }
     
+    // Handle "pset,channel,dac_value" command - pipelined set, acknowledged every PSET_CREDIT commands
+    if (strncmp((char*)rx_buffer, "pset,", 5) == 0)
+    {
+        char* comma = strchr((char*)rx_buffer + 5, ',');
+        uint8_t channel = (uint8_t)atoi((char*)rx_buffer + 5);
+        uint16_t dac_value = (comma != NULL) ? (uint16_t)atoi(comma + 1) : 4096;
+        
+        if (channel > 3 || dac_value > 4095)
+        {
+            PipelinedDone(HAL_ERROR);
+            return;
+        }
+        
+        // Write through the shadow so the other channels keep their values
+        dac_shadow[channel] = dac_value;
+        PipelinedDone(MCP4728_SetAllChannels(&hi2c1, dac_shadow));
+        return;
+    }
+    
+    // Handle "sync" command - report pipelined commands since the last ack and failed writes
+    if (strcmp((char*)rx_buffer, "sync") == 0)
+    {
+        int len = sprintf((char*)tx_buffer, "SYNC,%d,%d\r\n", pset_count, pset_errors);
+        HAL_UART_Transmit(&huart2, tx_buffer, len, 100);
+        pset_count = 0;
+        pset_errors = 0;
+        return;
+    }
+    
     // Handle "set_all,dac_value" command - set all channels to same value
     if (strncmp((char*)rx_buffer, "set_all,", 8) == 0)
     {
@@ -301,6 +468,7 @@ void ProcessUARTCommand(void)
         
         // Set all channels to the same value
         uint16_t dac_values[4] = {dac_value, dac_value, dac_value, dac_value};
+        memcpy(dac_shadow, dac_values, sizeof(dac_shadow));
         HAL_StatusTypeDef status = MCP4728_SetAllChannels(&hi2c1, dac_values);
         
         // Send response: 1 for success, 0 for failure
@@ -337,8 +505,9 @@ void ProcessUARTCommand(void)
         return;
     }
     
-    // Set DAC channel
-    HAL_StatusTypeDef status = MCP4728_WriteChannel(&hi2c1, (MCP4728_Channel)channel, dac_value);
+    // Set DAC channel through the shadow; MCP4728_WriteChannel would zero the other channels
+    dac_shadow[channel] = dac_value;
+    HAL_StatusTypeDef status = MCP4728_SetAllChannels(&hi2c1, dac_shadow);
     
     // Send response: 1 for success, 0 for failure
     if (status == HAL_OK)
@@ -353,6 +522,93 @@ void ProcessUARTCommand(void)
     }
 }
 
+/**
+  * @brief  Count one pipelined command and send the credit ack every PSET_CREDIT commands
+  * @param  status: Result of the DAC write; failures are reported by "sync"
+  * @note   Invalid commands count too, so the host's credit window stays in step
+  */
+static void PipelinedDone(HAL_StatusTypeDef status)
+{
+    if (status != HAL_OK)
+    {
+        pset_errors++;
+    }
+    if (++pset_count >= PSET_CREDIT)
+    {
+        pset_count = 0;
+        int len = sprintf((char*)tx_buffer, "ACK%d\r\n", PSET_CREDIT);
+        HAL_UART_Transmit(&huart2, tx_buffer, len, 100);
+    }
+}
+
+/**
+  * @brief  Handle a complete binary frame in rx_buffer (pipelined like "pset", except the _ACK opcodes)
+  */
+void ProcessBinaryFrame(void)
+{
+    if (rx_buffer[1] == BIN_OP_SET_ACK)
+    {
+        uint8_t channel = rx_buffer[2];
+        uint16_t value = rx_buffer[3] | (rx_buffer[4] << 8);
+        HAL_StatusTypeDef status = HAL_ERROR;
+        if (channel <= 3 && value <= 4095)
+        {
+            dac_shadow[channel] = value;
+            status = MCP4728_SetAllChannels(&hi2c1, dac_shadow);
+        }
+        
+        // Send response: 1 for success, 0 for failure
+        int len = sprintf((char*)tx_buffer, (status == HAL_OK) ? "1\r\n" : "0\r\n");
+        HAL_UART_Transmit(&huart2, tx_buffer, len, 100);
+    }
+    else if (rx_buffer[1] == BIN_OP_SET_ONE)
+    {
+        uint8_t channel = rx_buffer[2];
+        uint16_t value = rx_buffer[3] | (rx_buffer[4] << 8);
+        if (channel > 3 || value > 4095)
+        {
+            PipelinedDone(HAL_ERROR);
+            return;
+        }
+        dac_shadow[channel] = value;
+        PipelinedDone(MCP4728_SetAllChannels(&hi2c1, dac_shadow));
+    }
+    else if (rx_buffer[1] == BIN_OP_SET_MULTI || rx_buffer[1] == BIN_OP_SET_MULTI_ACK)
+    {
+        uint8_t mask = rx_buffer[2];
+        uint16_t values[4];
+        HAL_StatusTypeDef status = HAL_OK;
+        memcpy(values, dac_shadow, sizeof(values));
+        for (int ch = 0; ch < 4; ch++)
+        {
+            if (!(mask & (1 << ch))) continue;
+            values[ch] = rx_buffer[3 + 2 * ch] | (rx_buffer[4 + 2 * ch] << 8);
+            if (values[ch] > 4095)
+            {
+                status = HAL_ERROR;  // Reject the whole frame
+                break;
+            }
+        }
+        if (status == HAL_OK)
+        {
+            memcpy(dac_shadow, values, sizeof(dac_shadow));
+            // One sequential write updates all four outputs together
+            status = MCP4728_SetAllChannels(&hi2c1, dac_shadow);
+        }
+        
+        if (rx_buffer[1] == BIN_OP_SET_MULTI_ACK)
+        {
+            // Send response: 1 for success, 0 for failure
+            int len = sprintf((char*)tx_buffer, (status == HAL_OK) ? "1\r\n" : "0\r\n");
+            HAL_UART_Transmit(&huart2, tx_buffer, len, 100);
+        }
+        else
+        {
+            PipelinedDone(status);
+        }
+    }
+}
+
 /**
   * @brief  Read voltage from ADS1115 ADC channel
   * @param  channel: ADC channel (0-3)
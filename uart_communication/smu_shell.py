@@ -0,0 +1,96 @@
+import cmd
+import uart_com
+
+
+class SMUShell(cmd.Cmd):
+    """
+    Interactive shell that keeps one serial connection to the MCU open.
+
+    Each new script run opens the port again, which pays the USB-serial
+    open and the MCU handshake every time. Running commands from this shell
+    reuses the same connection for as long as it stays open.
+    """
+
+    intro = "POORMANs SMU shell. Type help or ? to list commands.\n"
+    prompt = "(smu) "
+
+    def __init__(self, dac, adc):
+        """
+        Args:
+            dac (DACController): Connected DAC controller
+            adc (ADCController): ADC controller sharing the DAC's port
+        """
+        super().__init__()
+        self.dac = dac
+        self.adc = adc
+
+    def _ints(self, arg, count, usage):
+        """Parse count integer arguments, printing usage on error."""
+        try:
+            values = [int(x) for x in arg.split()]
+        except ValueError:
+            values = []
+        if len(values) != count:
+            print(f"Usage: {usage}")
+            return None
+        return values
+
+    def do_ping(self, arg):
+        """ping: check communication with the MCU"""
+        self.dac.check_communication(verbose=True)
+
+    def do_set(self, arg):
+        """set <channel> <dac_value>: set one DAC channel (0-3, 0-4095)"""
+        args = self._ints(arg, 2, "set <channel> <dac_value>")
+        if args:
+            self.dac.set_dac(*args, verbose=True)
+
+    def do_setall(self, arg):
+        """setall <dac_value>: set all DAC channels to the same value"""
+        args = self._ints(arg, 1, "setall <dac_value>")
+        if args:
+            self.dac.set_all_channels(*args, verbose=True)
+
+    def do_sweep(self, arg):
+        """sweep <channel> <start> <end> <steps> [delay]: sweep one DAC channel"""
+        parts = arg.split()
+        delay = 0.1
+        if len(parts) == 5:
+            try:
+                delay = float(parts.pop())
+            except ValueError:
+                parts = []
+        args = self._ints(" ".join(parts), 4, "sweep <channel> <start> <end> <steps> [delay]")
+        if args:
+            self.dac.sweep_channel(*args, delay=delay)
+
+    def do_read(self, arg):
+        """read <channel>: read the voltage on an ADC channel (0-3)"""
+        args = self._ints(arg, 1, "read <channel>")
+        if args:
+            voltage = self.adc.read_voltage(*args, verbose=False)
+            print(f"Channel {args[0]}: {voltage:.4f}V" if voltage is not None else "No response")
+
+    def do_current(self, arg):
+        """current <channel>: read the shunt current on an ADC channel (0-3)"""
+        args = self._ints(arg, 1, "current <channel>")
+        if args:
+            current = self.adc.read_current(*args, verbose=False)
+            print(f"Channel {args[0]}: {current*1000:.3f}mA" if current is not None else "No response")
+
+    def do_quit(self, arg):
+        """quit: close the connection and exit"""
+        return True
+
+    do_exit = do_quit
+    do_EOF = do_quit
+
+
+if __name__ == "__main__":
+    # One port for the whole session, shared by the DAC and ADC controllers
+    with uart_com.DACController(port="COM3", baud=460800, verbose=True) as dac:
+        dac.warm_up()
+        adc = uart_com.ADCController(shared_port=dac.ser,
+                                     shunt_resistors=[200.0, 200.0, 200.0, 200.0],
+                                     verbose=False)
+        SMUShell(dac, adc).cmdloop()
@@ -0,0 +1,424 @@
+import asyncio
+import sys
+from collections import deque
+
+import numpy as np
+import serial_asyncio
+
+# The binary frames are defined once, in uart_com, for both transports
+from uart_com import _SET_ACK_BYTES
+
+
+class DACProtocol(asyncio.Protocol):
+    """
+    Line protocol for the STM32 firmware.
+
+    Each command that expects a reply registers a future; the MCU answers
+    commands in order, so every received line resolves the oldest pending
+    future. A reply that never arrives would leave every later command one
+    line off, so after a timeout resync() drops the pending futures and
+    discards input until the MCU answers "sync".
+    """
+
+    def __init__(self):
+        self.transport = None
+        self._buf = bytearray()
+        self._pending = deque()
+        self._sync = None  # Future for the "SYNC," reply while resyncing
+        self.connected = asyncio.get_running_loop().create_future()
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self.connected.set_result(True)
+
+    def data_received(self, data):
+        self._buf += data
+        while True:
+            i = self._buf.find(b"\n")
+            if i < 0:
+                return
+            line = self._buf[:i].decode(errors="replace").strip()
+            del self._buf[:i + 1]
+            # Skip blank lines and the boot banner, which answer no command
+            if not line or line == "READY":
+                continue
+            if self._sync is not None:
+                # Lines ahead of the sync reply answer commands that were already dropped
+                if line.startswith("SYNC,"):
+                    self._sync.set_result(True)
+                    self._sync = None
+                continue
+            if self._pending:
+                fut = self._pending.popleft()
+                if not fut.done():
+                    fut.set_result(line)
+
+    def connection_lost(self, exc):
+        while self._pending:
+            fut = self._pending.popleft()
+            if not fut.done():
+                fut.set_exception(ConnectionError("Serial connection lost"))
+        if self._sync is not None:
+            self._sync.set_exception(ConnectionError("Serial connection lost"))
+            self._sync = None
+
+    def request(self, data):
+        """Send a command and return a future for its reply line."""
+        fut = asyncio.get_running_loop().create_future()
+        self._pending.append(fut)
+        self.transport.write(data)
+        return fut
+
+    def resync(self):
+        """
+        Drop pending replies and realign with the MCU's reply stream.
+
+        Pending futures resolve to None, "sync" is sent, and received lines are
+        discarded until its reply. Commands sent after this pair up normally.
+
+        Returns:
+            asyncio.Future: Resolves to True once the sync reply has arrived
+        """
+        if self._sync is None:
+            while self._pending:
+                fut = self._pending.popleft()
+                if not fut.done():
+                    fut.set_result(None)
+            self._buf.clear()
+            self._sync = asyncio.get_running_loop().create_future()
+            self.transport.write(b"sync\n")
+        return self._sync
+
+    def reset(self):
+        """Forget pending replies and buffered input (e.g. after the startup handshake)."""
+        self._pending.clear()
+        self._buf.clear()
+        if self._sync is not None:
+            self._sync.set_result(False)
+            self._sync = None
+
+
+class AsyncSerialController:
+    """
+    asyncio counterpart of SerialController: one serial_asyncio connection to the MCU.
+
+    Commands are written as soon as they are issued and their replies awaited,
+    so the event loop keeps running (other sweeps, reads, host-side work)
+    while the MCU answers.
+    """
+
+    def __init__(self, transport, protocol, verbose=True):
+        """
+        Wrap an open serial_asyncio connection. Use open() to create one.
+
+        Args:
+            transport: serial_asyncio transport
+            protocol (DACProtocol): Protocol instance attached to the transport
+            verbose (bool): Print status messages
+        """
+        self.transport = transport
+        self.protocol = protocol
+        self.verbose = verbose
+
+    @classmethod
+    async def open(cls, port="COM3", baud=460800, verbose=True, poll_interval=0.0005, **kwargs):
+        """
+        Open the serial port and wait for the MCU to answer.
+
+        Args:
+            port (str): Serial port name (e.g., "COM3", "/dev/ttyUSB0")
+            baud (int): Baud rate (default: 460800)
+            verbose (bool): Print status messages
+            poll_interval (float): Windows only: how often the transport polls the
+                port for received bytes, in seconds (no selector for COM ports there)
+            **kwargs: Passed on to the controller's constructor
+
+        Returns:
+            AsyncSerialController: Connected controller of the class it was called on
+        """
+        loop = asyncio.get_running_loop()
+        transport, protocol = await serial_asyncio.create_serial_connection(
+            loop, DACProtocol, port, baudrate=baud)
+        await protocol.connected
+        if sys.platform == "win32" and hasattr(transport, "_poll_wait_time"):
+            transport._poll_wait_time = poll_interval
+        ctrl = cls(transport, protocol, verbose=verbose, **kwargs)
+        if not await ctrl.wait_until_ready() and verbose:
+            print(f"⚠️  No answer from MCU on {port} within 2s")
+        elif verbose:
+            print(f"✓ Successfully connected to {port}\n")
+        return ctrl
+
+    async def wait_until_ready(self, timeout=2.0):
+        """
+        Wait until the MCU answers, polling with COMM_OK every 100 ms.
+
+        Args:
+            timeout (float): Maximum time to wait in seconds
+
+        Returns:
+            bool: True as soon as the MCU responds, False on timeout
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while loop.time() < deadline:
+            try:
+                response = await asyncio.wait_for(self.protocol.request(b"COMM_OK\n"), 0.1)
+            except asyncio.TimeoutError:
+                continue
+            if "COMM_OK" in response.upper():
+                # Unanswered pings from before the MCU was up must not eat later replies
+                self.protocol.reset()
+                return True
+        return False
+
+    async def request(self, data, timeout=2.0):
+        """
+        Send a command and await its reply line.
+
+        Args:
+            data (bytes): Encoded command
+            timeout (float): Timeout in seconds when waiting for response
+
+        Returns:
+            str: Reply line, or None on timeout
+        """
+        try:
+            return await asyncio.wait_for(self.protocol.request(data), timeout)
+        except asyncio.TimeoutError:
+            # The reply may be lost rather than late; realign before the next command
+            await self.resync(timeout)
+            return None
+
+    async def resync(self, timeout=2.0):
+        """
+        Realign replies with commands after a lost or unexpected line.
+
+        Commands still waiting for a reply get None. If the MCU doesn't answer
+        "sync" in time, all pending state is dropped instead.
+
+        Args:
+            timeout (float): Timeout in seconds when waiting for the sync reply
+
+        Returns:
+            bool: True if the MCU answered the sync, False otherwise
+        """
+        try:
+            # Shielded: concurrent callers share one sync, and a timeout here must not cancel it
+            return await asyncio.wait_for(asyncio.shield(self.protocol.resync()), timeout)
+        except asyncio.TimeoutError:
+            if self.verbose:
+                print(f"  Warning: No sync reply from MCU within {timeout}s")
+            self.protocol.reset()
+            return False
+
+    async def check_communication(self, timeout=2.0):
+        """
+        Check if communication with MCU is working by sending a COMM_OK command.
+
+        Args:
+            timeout (float): Maximum time to wait for response in seconds
+
+        Returns:
+            bool: True if communication is OK, False otherwise
+        """
+        response = await self.request(b"COMM_OK\n", timeout)
+        ok = response is not None and "COMM_OK" in response.upper()
+        if self.verbose:
+            print(f"  ✓ Communication OK: {response}" if ok else f"  ✗ Unexpected or no response: {response}")
+        return ok
+
+    def close(self):
+        """Close the serial connection."""
+        self.transport.close()
+
+
+class AsyncDACController(AsyncSerialController):
+    """
+    asyncio counterpart of DACController for sweeps driven from an event loop.
+
+    Sweeps await each acknowledgment and their step delay instead of blocking,
+    so several channels can sweep concurrently on one port with asyncio.gather.
+    """
+
+    def __init__(self, transport, protocol, verbose=True):
+        """
+        Wrap an open serial_asyncio connection. Use AsyncDACController.open() to create one.
+
+        Args:
+            transport: serial_asyncio transport
+            protocol (DACProtocol): Protocol instance attached to the transport
+            verbose (bool): Print status messages
+        """
+        super().__init__(transport, protocol, verbose)
+        # SET_ACK frames for all 4 x 4096 commands, shared with DACController
+        self._cmd_bytes = _SET_ACK_BYTES
+
+    async def set_dac(self, channel, dac_value, timeout=2.0):
+        """
+        Set DAC value for a specific channel and await the MCU acknowledgment.
+
+        Args:
+            channel (int): Channel number (0-3)
+            dac_value (int): DAC code value (0-4095)
+            timeout (float): Timeout in seconds when waiting for response
+
+        Returns:
+            tuple: (success: bool, response: str) - success indicates if command was sent,
+                   response contains MCU acknowledgment or None if timeout
+        """
+        if channel < 0 or channel > 3:
+            print(f"Error: Channel must be 0-3, got {channel}")
+            return False, None
+
+        if dac_value < 0 or dac_value > 4095:
+            print(f"Error: DAC value must be 0-4095, got {dac_value}")
+            return False, None
+
+        response = await self.request(self._cmd_bytes[channel][dac_value], timeout)
+        if response is None and self.verbose:
+            print(f"  Warning: No response from MCU within {timeout}s")
+        return True, response
+
+    async def sweep_channel(self, channel, start_value, end_value, steps, delay=0.1, progress_every=100):
+        """
+        Sweep a DAC channel from start_value to end_value.
+
+        Args:
+            channel (int): Channel number (0-3)
+            start_value (int): Starting DAC value (0-4095)
+            end_value (int): Ending DAC value (0-4095)
+            steps (int): Number of steps in the sweep
+            delay (float): Step period in seconds
+            progress_every (int): In verbose mode, report every progress_every-th step
+                after the sweep (0: only the last step)
+        """
+        if steps < 1:
+            print("Error: Steps must be >= 1")
+            return
+
+        # The whole ramp in one vectorized pass, as in DACController.sweep_channel
+        values = np.linspace(start_value, end_value, steps).astype(np.uint16).tolist()
+
+        if self.verbose:
+            print(f"Sweeping channel {channel} from {start_value} to {end_value} in {steps} steps...")
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time()
+        responses = []
+        for dac_value in values:
+            success, response = await self.set_dac(channel, dac_value)
+            responses.append(response)
+            # Pace against a deadline; the other sweeps run while this one waits
+            deadline += delay
+            await asyncio.sleep(max(0.0, deadline - loop.time()))
+
+        if self.verbose:
+            # Report after the sweep so console writes never delay a step
+            report = range(0, steps, progress_every) if progress_every > 0 else ()
+            print("\n".join(f"  Step {i+1}/{steps}: Channel {channel} = {values[i]} - {responses[i]}"
+                            for i in sorted(set(report) | {steps - 1})))
+
+    async def sweep_channels(self, channel_configs, delay=0.1, progress_every=100):
+        """
+        Sweep several channels concurrently on the one port.
+
+        Args:
+            channel_configs (list): Dicts with 'channel', 'start', 'end', 'steps'
+                (as for DACController.sweep_channels_independent)
+            delay (float): Step period in seconds
+            progress_every (int): See sweep_channel
+        """
+        await asyncio.gather(*(
+            self.sweep_channel(c['channel'], c['start'], c['end'], c['steps'], delay, progress_every)
+            for c in channel_configs))
+
+
+class AsyncADCController(AsyncSerialController):
+    """
+    asyncio counterpart of ADCController.
+
+    read_all_voltages() writes the four read commands back to back and awaits
+    the replies together, so the MCU's conversion time overlaps the UART
+    transfer of the next command instead of adding a round-trip per channel.
+    """
+
+    def __init__(self, transport, protocol, verbose=True, shunt_resistors=(1.0, 1.0, 1.0, 1.0)):
+        """
+        Wrap an open serial_asyncio connection. Use AsyncADCController.open() to create one.
+
+        Args:
+            transport: serial_asyncio transport
+            protocol (DACProtocol): Protocol instance attached to the transport
+            verbose (bool): Print status messages
+            shunt_resistors (list): Shunt resistor values in Ohms for each channel [ch0, ch1, ch2, ch3]
+        """
+        super().__init__(transport, protocol, verbose)
+        self.shunt_resistors = list(shunt_resistors)
+        self._read_adc_bytes = [f"read_adc,{ch}\n".encode('ascii') for ch in range(4)]
+
+    async def read_voltage(self, channel, timeout=2.0):
+        """
+        Read voltage from an ADC channel.
+
+        Args:
+            channel (int): Channel number (0-3)
+            timeout (float): Timeout in seconds when waiting for response
+
+        Returns:
+            float: Voltage in Volts, or None if error
+        """
+        if channel < 0 or channel > 3:
+            print(f"Error: Channel must be 0-3, got {channel}")
+            return None
+
+        response = await self.request(self._read_adc_bytes[channel], timeout)
+        try:
+            # Response might be "voltage,raw_adc" or just "voltage"
+            return float(response.split(",")[0])
+        except (AttributeError, ValueError):
+            if self.verbose:
+                print(f"Warning: No valid response from MCU within {timeout}s for channel {channel}: {response!r}")
+            return None
+
+    async def read_current(self, channel, timeout=2.0):
+        """
+        Read current through the shunt resistor on an ADC channel.
+
+        Args:
+            channel (int): Channel number (0-3)
+            timeout (float): Timeout in seconds when waiting for response
+
+        Returns:
+            float: Current in Amperes, or None if error
+        """
+        voltage = await self.read_voltage(channel, timeout)
+        return None if voltage is None else voltage / self.shunt_resistors[channel]
+
+    async def read_all_voltages(self, timeout=2.0):
+        """
+        Read voltages from all 4 ADC channels with the commands in flight together.
+
+        Args:
+            timeout (float): Timeout in seconds when waiting for each response
+
+        Returns:
+            list: List of voltages [ch0, ch1, ch2, ch3] in Volts, None values on error
+        """
+        return list(await asyncio.gather(*(self.read_voltage(ch, timeout) for ch in range(4))))
+
+
+async def main():
+    dac = await AsyncDACController.open(port="COM3", baud=460800, verbose=True)
+    try:
+        # Channels 0 and 1 sweep in opposite directions at the same time
+        await dac.sweep_channels([
+            {'channel': 0, 'start': 0, 'end': 4095, 'steps': 100},
+            {'channel': 1, 'start': 4095, 'end': 0, 'steps': 100},
+        ], delay=0.05)
+    finally:
+        dac.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,7 +1,64 @@
+import atexit
+import os
 import serial
 import serial.tools.list_ports
+import struct
+import queue
+import select
+import selectors
+import sys
+import threading
+import weakref
 import time
+import numpy as np
 
+try:
+    # Optional compiled sweep loop; build with: cythonize -i _sweep_core.pyx
+    import _sweep_core
+except ImportError:
+    _sweep_core = None
+
+# Binary ADC reply to "read_adc_bin,ch": sync 0xAA, channel, raw count (int32), XOR checksum
+_FRAME = struct.Struct("<BBiB")
+_FRAME_SYNC = 0xAA
+# ADS1115 at the ±6.144 V PGA setting used by the firmware
+_ADC_LSB_V = 6.144 / 32768
+
+# Binary DAC frames start with sync 0xA5 and an opcode. SET_ONE carries a channel and
+# a 12-bit value; SET_MULTI a channel mask (bit n = channel n) and four values, where
+# channels outside the mask keep their current output. SET_ACK and SET_MULTI_ACK are
+# SET_ONE and SET_MULTI answered with "1"/"0" like the text "channel,value" command
+# instead of being pipelined.
+_BIN_SYNC = 0xA5
+_OP_SET_ONE = 0x01
+_OP_SET_MULTI = 0x02
+_OP_SET_ACK = 0x03
+_OP_SET_MULTI_ACK = 0x04
+_SET_ONE = struct.Struct("<BBBH")
+_SET_MULTI = struct.Struct("<BBBHHHH")
+# The same layouts as NumPy records, for encoding a whole sweep in one go
+_SET_ONE_DTYPE = np.dtype([('sync', 'u1'), ('op', 'u1'), ('ch', 'u1'), ('val', '<u2')])
+_SET_MULTI_DTYPE = np.dtype([('sync', 'u1'), ('op', 'u1'), ('mask', 'u1'), ('val', '<u2', (4,))])
+# DAC codes and channels are bounded, so their ASCII forms and every single-channel
+# frame are encoded once at import and shared by all controllers
+_DAC_STR = [str(v).encode('ascii') for v in range(4096)]
+_CH_STR = [f"{ch},".encode('ascii') for ch in range(4)]
+_SET_ACK_BYTES = [[_SET_ONE.pack(_BIN_SYNC, _OP_SET_ACK, ch, v) for v in range(4096)] for ch in range(4)]
+_SET_ONE_BYTES = [[_SET_ONE.pack(_BIN_SYNC, _OP_SET_ONE, ch, v) for v in range(4096)] for ch in range(4)]
+_SET_ALL_BYTES = [b"set_all," + v + b"\n" for v in _DAC_STR]
+# Full-speed USB bulk packet; unpaced sweeps write at least this much per call
+_USB_PACKET = 64
+# Linux usb-serial drivers (FTDI and friends) expose their receive latency timer here
+_LATENCY_TIMER = "/sys/bus/usb-serial/devices/{tty}/latency_timer"
+_UDEV_HINT = ('ACTION=="add", SUBSYSTEM=="usb-serial", DRIVER=="ftdi_sio", ATTR{latency_timer}="1"')
+_udev_hint_shown = False
+# Receive buffer per open port, so controllers sharing a port never lose each other's bytes
+_RX_BUFFERS = weakref.WeakKeyDictionary()
+# Lock per open port, held across each command and its reply
+_PORT_LOCKS = weakref.WeakKeyDictionary()
+# Ports opened by controllers, keyed by (port, baud): [serial.Serial, number of controllers using it]
+_BUSES = {}
+_BUSES_LOCK = threading.Lock()
 
 def list_available_ports():
     """List all available COM ports."""
@@ -15,70 +72,162 @@ def list_available_ports():
     print()
 
 
+def raise_priority(verbose=True):
+    """
+    Cut scheduler jitter for timing-sensitive sweeps in this process.
+    
+    On Windows: HIGH_PRIORITY_CLASS and a 1 ms system timer resolution (so short
+    time.sleep() calls are not rounded up to the 15.6 ms default tick); the
+    timer resolution is restored at exit. On Linux: pin the process to one core
+    and lower its nice value, which needs privileges and is skipped otherwise.
+    
+    Args:
+        verbose (bool): Print what could not be changed
+    """
+    if sys.platform == "win32":
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        HIGH_PRIORITY_CLASS = 0x00000080
+        if not kernel32.SetPriorityClass(kernel32.GetCurrentProcess(), HIGH_PRIORITY_CLASS) and verbose:
+            print("  Could not raise process priority")
+        winmm = ctypes.windll.winmm
+        if winmm.timeBeginPeriod(1) == 0:
+            atexit.register(winmm.timeEndPeriod, 1)
+        elif verbose:
+            print("  Could not set 1 ms timer resolution")
+    elif sys.platform.startswith("linux"):
+        # The last allowed core is the least likely to be busy with interrupts
+        try:
+            os.sched_setaffinity(0, {max(os.sched_getaffinity(0))})
+        except OSError:
+            if verbose:
+                print("  Could not pin the process to one core (restricted by the container or cgroup)")
+        try:
+            os.nice(-5)
+        except PermissionError:
+            if verbose:
+                print("  Could not raise process priority (needs root or CAP_SYS_NICE)")
+
+
+def open_port(port, baud=460800, timeout=1, reset_mcu=False):
+    """
+    Open a serial port without pulsing DTR/RTS.
+    
+    serial.Serial(port, ...) asserts DTR and RTS as it opens, which resets boards
+    that wire those lines to the MCU reset and delays the first handshake by the
+    reset and boot time. Configuring the port first and opening it afterwards
+    keeps both lines deasserted.
+    
+    Args:
+        port (str): Serial port name (e.g., "COM3", "/dev/ttyUSB0")
+        baud (int): Baud rate (default: 460800)
+        timeout (float): Read timeout in seconds
+        reset_mcu (bool): Assert DTR/RTS on open as pyserial does by default
+    
+    Returns:
+        serial.Serial: Open port
+    """
+    ser = serial.Serial()
+    ser.port = port
+    ser.baudrate = baud
+    ser.timeout = timeout
+    ser.dtr = reset_mcu
+    ser.rts = reset_mcu
+    ser.open()
+    return ser
+
+
 class SerialController:
     """
     Base class for serial communication with STM32 MCU.
     Provides common serial connection and communication methods.
     """
     
-    def __init__(self, port="COM3", baud=115200, auto_connect=True, verbose=True):
+    def __init__(self, port="COM3", baud=460800, auto_connect=True, verbose=True, shared_port=None,
+                 reset_mcu=False, reset_wait=2.0):
         """
         Initialize the serial controller.
         
         Args:
             port (str): Serial port name (e.g., "COM3", "/dev/ttyUSB0")
-            baud (int): Baud rate (default: 115200)
+            baud (int): Baud rate (default: 460800)
             auto_connect (bool): Automatically connect on initialization
             verbose (bool): Print connection messages
+            shared_port (serial.Serial): Already-open port to use instead of opening one.
+                The controller does not own it, so close() leaves it open.
+                Controllers created for the same port and baud share it without this.
+            reset_mcu (bool): Assert DTR/RTS when opening the port, resetting boards
+                that wire them to the MCU reset (default: leave the MCU running)
+            reset_wait (float): Longest wait in seconds for the MCU to answer after
+                the port opens; 0 skips the handshake for an MCU that is already running
         """
         self.port = port
         self.baud = baud
         self.ser = None
         self.verbose = verbose
-        
-        if auto_connect:
+        self.reset_mcu = reset_mcu
+        self.reset_wait = reset_wait
+        self._bus_key = None
+        self._sel = None
+        
+        if shared_port is not None:
+            self.ser = shared_port
+            self.port = shared_port.port
+            self.baud = shared_port.baudrate
+            self._bind_io()
+        elif auto_connect:
             self.connect()
     
     def connect(self):
-        """Establish serial connection to the MCU."""
-        # List available ports
-        list_available_ports()
-        
-        # Check if the requested port is available
-        if self.verbose:
-            print(f"Checking if {self.port} is available...")
+        """
+        Establish serial connection to the MCU.
         
-        if not self._check_port_available(self.port):
+        If another controller already opened the same port at the same baud
+        rate, its connection is shared. Otherwise the port is opened straight away; the availability probe and release
+        attempt (each an extra open, and on Windows an extra MCU reset) only
+        run if that open fails.
+        """
+        with _BUSES_LOCK:
+            self._connect()
+    
+    def _connect(self):
+        """connect() with _BUSES_LOCK held."""
+        key = (self.port, self.baud)
+        bus = _BUSES.get(key)
+        if bus is not None and bus[0].is_open:
+            # Another controller already has this port open: share it rather
+            # than opening it again (which fails, or resets the MCU)
+            self.ser = bus[0]
+            bus[1] += 1
+            self._bus_key = key
+            self._bind_io()
             if self.verbose:
-                print(f"⚠️  {self.port} appears to be in use!")
-                print("\nCommon causes:")
-                print("  • STM32CubeIDE Serial Monitor is open")
-                print("  • STM32CubeIDE debugger is running")
-                print("  • Another Python script is using the port")
-                print("  • Previous script didn't close properly")
-                print("\nTrying to release the port...")
-            
-            if self._try_release_port(self.port):
-                if self.verbose:
-                    print("  ✓ Port released, trying again...")
-                time.sleep(1)
-            else:
-                if self.verbose:
-                    print("  ✗ Could not release port automatically")
-                    print("\nManual steps:")
-                    print("  1. Close STM32CubeIDE completely (check system tray)")
-                    print("  2. Close any other terminals running Python scripts")
-                    print("  3. Unplug and replug USB cable")
-                    print("  4. Or try a different COM port from the list above")
-                    print()
-                raise serial.SerialException(f"Port {self.port} is locked by another program")
+                print(f"✓ Sharing the open connection to {self.port}\n")
+            return
+        
+        if self.verbose:
+            list_available_ports()
         
         # Initialize serial connection
         try:
             if self.verbose:
                 print(f"Attempting to open {self.port}...")
-            self.ser = serial.Serial(self.port, self.baud, timeout=1)
-            time.sleep(2)   # Wait for STM32 reset
+            try:
+                self.ser = open_port(self.port, self.baud, timeout=1, reset_mcu=self.reset_mcu)
+            except serial.SerialException:
+                if not self._recover_port():
+                    raise
+                self.ser = open_port(self.port, self.baud, timeout=1, reset_mcu=self.reset_mcu)
+            _BUSES[key] = [self.ser, 1]
+            self._bus_key = key
+            self._bind_io()
+            # Before the first handshake, so every round-trip benefits
+            self.set_low_latency()
+            # Wait for STM32 to answer instead of sleeping a fixed time
+            if self.reset_wait > 0 and not self.wait_until_ready(timeout=self.reset_wait) and self.verbose:
+                print(f"⚠️  No answer from MCU on {self.port} within {self.reset_wait}s")
+            # Drop any boot noise once here instead of before every command
+            self._reset_input()
             if self.verbose:
                 print(f"✓ Successfully connected to {self.port}\n")
         except serial.SerialException as e:
@@ -95,10 +244,47 @@ class SerialController:
                 print("\nAlternative: Use a different COM port from the list above")
             raise
     
+    def _recover_port(self):
+        """
+        Diagnose a failed open: report why the port may be busy and try to release it.
+        
+        Returns:
+            bool: True if the port was released and the open is worth retrying
+        """
+        if self.verbose:
+            print(f"Checking if {self.port} is available...")
+        if self._check_port_available(self.port):
+            # Free now (e.g. it was just closed elsewhere), so retry the open
+            return True
+        
+        if self.verbose:
+            print(f"⚠️  {self.port} appears to be in use!")
+            print("\nCommon causes:")
+            print("  • STM32CubeIDE Serial Monitor is open")
+            print("  • STM32CubeIDE debugger is running")
+            print("  • Another Python script is using the port")
+            print("  • Previous script didn't close properly")
+            print("\nTrying to release the port...")
+        
+        if self._try_release_port(self.port):
+            if self.verbose:
+                print("  ✓ Port released, trying again...")
+            time.sleep(1)
+            return True
+        if self.verbose:
+            print("  ✗ Could not release port automatically")
+            print("\nManual steps:")
+            print("  1. Close STM32CubeIDE completely (check system tray)")
+            print("  2. Close any other terminals running Python scripts")
+            print("  3. Unplug and replug USB cable")
+            print("  4. Or try a different COM port from the list above")
+            print()
+        return False
+    
     def _check_port_available(self, port_name):
         """Check if a port is available by trying to open it."""
         try:
-            test_ser = serial.Serial(port_name, self.baud, timeout=0.1)
+            test_ser = open_port(port_name, self.baud, timeout=0.1)
             test_ser.close()
             return True
         except:
@@ -108,37 +294,350 @@ class SerialController:
         """Try to release a port by attempting to close any existing connection."""
         try:
             # Try to open and immediately close to release it
-            temp_ser = serial.Serial(port_name, self.baud, timeout=0.1)
+            temp_ser = open_port(port_name, self.baud, timeout=0.1)
             temp_ser.close()
             time.sleep(0.5)
             return True
         except:
             return False
     
-    def wait_for_mcu_response(self, timeout=2.0):
+    def wait_until_ready(self, timeout=2.0):
         """
-        Wait for a response from the MCU (blocking with timeout).
+        Wait until the MCU answers, polling with COMM_OK every 100 ms.
+        Also accepts the READY banner the firmware prints after boot.
         
         Args:
             timeout (float): Maximum time to wait in seconds
         
         Returns:
-            str: Response line if received, None if timeout
+            bool: True as soon as the MCU responds, False on timeout
+        """
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            self.ser.write(b"COMM_OK\n")
+            response = self.wait_for_mcu_response(0.1)
+            if response and ("COMM_OK" in response.upper() or response.upper() == "READY"):
+                return True
+        return False
+    
+    def set_low_latency(self, enabled=True):
+        """
+        Ask the USB-serial driver to pass received bytes on immediately instead of
+        buffering them for up to its 16 ms latency timer.
+        On Linux the usb-serial latency_timer in sysfs is set to 1 ms as well.
+        connect() enables this on every port it opens; call it yourself for a
+        port passed in as shared_port.
+        
+        Args:
+            enabled (bool): True to enable low-latency mode, False to restore the default
+        
+        Returns:
+            bool: True if the driver accepted the setting, False if unsupported
+        """
+        try:
+            # Linux only (ASYNC_LOW_LATENCY via TIOCSSERIAL); other platforms lack the method
+            self.ser.set_low_latency_mode(enabled)
+            ok = True
+        except (AttributeError, IOError, ValueError, NotImplementedError) as e:
+            if self.verbose and sys.platform == "win32":
+                # The FTDI VCP driver keeps its latency timer in the registry
+                print(f"  Low-latency mode can't be set from Python on Windows; for an FTDI adapter set "
+                      f"Device Manager > {self.port} > Port Settings > Advanced > Latency Timer to 1 ms")
+            elif self.verbose:
+                print(f"  Low-latency mode not available on {self.port}: {e}")
+            ok = False
+        # Some drivers accept the ioctl without shortening the timer, so also set it directly
+        if sys.platform.startswith('linux'):
+            ok = self._set_latency_timer(1 if enabled else 16) or ok
+        return ok
+    
+    def _set_latency_timer(self, ms):
+        """
+        Write the usb-serial latency timer through sysfs (Linux).
+        
+        Args:
+            ms (int): Latency timer in milliseconds (1 = lowest, 16 = driver default)
+        
+        Returns:
+            bool: True if the timer was written
+        """
+        global _udev_hint_shown
+        tty = str(self.ser.name).rsplit("/", 1)[-1]
+        path = _LATENCY_TIMER.format(tty=tty)
+        try:
+            with open(path, "w") as f:
+                f.write(str(ms))
+        except PermissionError:
+            if self.verbose and not _udev_hint_shown:
+                _udev_hint_shown = True
+                print(f"  No permission to write {path}; to set it at plug-in, add the udev rule")
+                print(f"    {_UDEV_HINT}")
+            return False
+        except OSError:
+            # Not a usb-serial device (e.g. a CDC-ACM /dev/ttyACM*), so no timer to set
+            return False
+        return True
+    
+    def _bind_io(self):
+        """
+        Choose the write used on the sweep hot path and how replies are awaited,
+        and attach the port's receive buffer and lock.
+        
+        On POSIX the port is a plain file descriptor, so os.write() on it skips
+        pyserial's per-call checks, and replies are awaited in a selector
+        (epoll on Linux) registered once here. Elsewhere (the Windows handle is
+        opened for overlapped I/O) or for port objects without a descriptor,
+        pyserial's own write and blocking reads are used.
+        """
+        # Received bytes not yet consumed; controllers sharing a port share it
+        self._rx = _RX_BUFFERS.setdefault(self.ser, bytearray())
+        self._lock = _PORT_LOCKS.setdefault(self.ser, threading.RLock())
+        self._write = self.ser.write
+        self._sel = None
+        if os.name != 'posix':
+            return
+        try:
+            self._fd = self.ser.fileno()
+        except (AttributeError, IOError, ValueError):
+            return
+        self._write = self._write_fd
+        self._sel = selectors.DefaultSelector()
+        self._sel.register(self._fd, selectors.EVENT_READ)
+    
+    def _write_fd(self, data):
+        """Write data straight to the port's file descriptor."""
+        try:
+            n = os.write(self._fd, data)
+        except BlockingIOError:
+            n = 0
+        # The descriptor is non-blocking; let pyserial wait out a full driver buffer
+        if n < len(data):
+            self.ser.write(memoryview(data)[n:])
+    
+    def _fill(self, deadline, timeout):
         """
-        start_time = time.time()
+        Move everything the driver has received into the receive buffer, waiting
+        for the first byte if nothing has arrived yet.
+        
+        Args:
+            deadline (float): time.perf_counter() value to give up at
+            timeout (float): Blocking read timeout for ports without a selector
         
-        while (time.time() - start_time) < timeout:
-            if self.ser.in_waiting > 0:
+        Returns:
+            bool: True if bytes were added, False on timeout
+        """
+        if self._sel is not None:
+            ready = False
+            while True:
                 try:
-                    line = self.ser.readline().decode().strip()
-                    if line:
-                        return line
-                except (UnicodeDecodeError, serial.SerialException):
-                    pass
-            time.sleep(0.01)  # Small delay to avoid busy waiting
-        
-        return None
+                    chunk = os.read(self._fd, 4096)
+                except BlockingIOError:
+                    chunk = b""
+                if chunk:
+                    self._rx += chunk
+                    return True
+                # Nothing buffered (a tty may report that as EAGAIN or as an
+                # empty read); only an empty read right after the selector
+                # reported data means the device went away
+                if ready:
+                    raise serial.SerialException("device reports readiness to read but returned no data")
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0 or not self._sel.select(remaining):
+                    return False
+                ready = True
+        
+        ser = self.ser
+        n = ser.in_waiting
+        if not n:
+            if time.perf_counter() >= deadline:
+                return False
+            # Block in the driver for the first byte; only touch the port
+            # settings when the timeout actually changes
+            if ser.timeout != timeout:
+                ser.timeout = timeout
+            chunk = ser.read(1)
+            if not chunk:
+                return False
+            self._rx += chunk
+            n = ser.in_waiting
+        if n:
+            self._rx += ser.read(n)
+        return True
+    
+    def _read_until(self, expected=b"\n", size=None, timeout=2.0):
+        """
+        Like serial.Serial.read_until, served from the receive buffer.
+        
+        Each wake-up moves everything the driver holds into the buffer in one
+        read, rather than one read per byte; bytes after the reply stay
+        buffered for the next call.
+        
+        Args:
+            expected (bytes): Terminator to stop at (inclusive), or None to read size bytes
+            size (int): Number of bytes to read when expected is None
+            timeout (float): Maximum time to wait in seconds
+        
+        Returns:
+            bytes: Bytes read; shorter than asked for on timeout
+        """
+        rx = self._rx
+        deadline = time.perf_counter() + timeout
+        start = 0
+        while True:
+            if expected:
+                i = rx.find(expected, start)
+                if i >= 0:
+                    end = i + len(expected)
+                    break
+                # Only scan the new bytes next time
+                start = max(0, len(rx) - len(expected) + 1)
+            elif len(rx) >= size:
+                end = size
+                break
+            if not self._fill(deadline, timeout):
+                # Timed out: hand back what did arrive, as pyserial does
+                end = len(rx) if expected else min(size, len(rx))
+                break
+        data = bytes(rx[:end])
+        del rx[:end]
+        return data
+    
+    def _find_line(self, timeout=2.0):
+        """
+        Wait until a whole line is in the receive buffer, without consuming it.
+        
+        Lets callers parse the line in place through a memoryview and then drop
+        it with del self._rx[:idx + 1], instead of copying it out first.
+        
+        Args:
+            timeout (float): Maximum time to wait in seconds
+        
+        Returns:
+            int: Index of the newline ending the line, or -1 on timeout
+        """
+        rx = self._rx
+        deadline = time.perf_counter() + timeout
+        start = 0
+        while True:
+            i = rx.find(b"\n", start)
+            if i >= 0:
+                return i
+            start = len(rx)
+            if not self._fill(deadline, timeout):
+                return -1
+    
+    def _reset_input(self):
+        """Discard buffered input, both in the driver and in the receive buffer."""
+        self.ser.reset_input_buffer()
+        self._rx.clear()
+    
+    def wait_for_mcu_response(self, timeout=2.0, decode_text=True):
+        """
+        Wait for a response from the MCU (blocking with timeout).
+        
+        Args:
+            timeout (float): Maximum time to wait in seconds
+            decode_text (bool): Return str; False returns the stripped bytes so
+                numeric replies can go straight to float()/int() without decoding
+        
+        Returns:
+            str: Response line if received (bytes if decode_text is False), None if timeout
+        """
+        with self._lock:
+            try:
+                line = self._read_until(b"\n", timeout=timeout)
+            except (OSError, serial.SerialException):
+                return None
+            if not line.endswith(b"\n"):
+                # Timed out: drop the partial line and anything behind it, so a
+                # late reply isn't taken as the answer to the next command.
+                # Credit acks are consumed right after the write that triggers
+                # them, so nothing else can be pending here.
+                self._reset_input()
+                return None
+        line = line.strip()
+        if not line:
+            return None
+        # A stray noise byte (e.g. from a reset) must not cost the whole reply
+        return line.decode(errors='ignore') if decode_text else line
+
+    def _request(self, data, timeout=2.0, decode_text=True):
+        """
+        Send a command and wait for its reply line, holding the port lock
+        throughout so another thread on the same port can't take the reply.
+        
+        Args:
+            data (bytes): Encoded command
+            timeout (float): Maximum time to wait in seconds
+            decode_text (bool): See wait_for_mcu_response
+        
+        Returns:
+            str: Response line if received (bytes if decode_text is False), None if timeout
+        """
+        with self._lock:
+            self._write(data)
+            return self.wait_for_mcu_response(timeout, decode_text)
+
+    def _read_binary_frame(self, timeout=2.0):
+        """
+        Read one binary ADC frame from the MCU (blocking with timeout).
+        
+        Args:
+            timeout (float): Maximum time to wait in seconds
+        
+        Returns:
+            tuple: (channel, raw_adc) if a valid frame arrived, None otherwise
+        """
+        try:
+            # Skip anything before the sync byte (e.g. a stray text line)
+            hdr = self._read_until(bytes([_FRAME_SYNC]), timeout=timeout)
+            if not hdr.endswith(bytes([_FRAME_SYNC])):
+                return None
+            buf = self._read_until(None, _FRAME.size - 1, timeout)
+        except (OSError, serial.SerialException):
+            return None
+        if len(buf) != _FRAME.size - 1:
+            return None
+        
+        frame = bytes([_FRAME_SYNC]) + buf
+        checksum = 0
+        for b in frame[:-1]:
+            checksum ^= b
+        if checksum != frame[-1]:
+            return None
+        _, channel, raw_adc, _ = _FRAME.unpack(frame)
+        return channel, raw_adc
 
+    def read_response_fast(self, n, timeout=2.0):
+        """
+        Busy-poll for exactly n bytes instead of blocking in the driver.
+        
+        A blocking read returns only after the OS scheduler wakes the thread,
+        which can add a millisecond or more; spinning on in_waiting returns as
+        soon as the bytes reach the host. Meant for short, fixed-size replies
+        in sweep loops.
+        
+        Args:
+            n (int): Number of bytes expected
+            timeout (float): Maximum time to spin in seconds
+        
+        Returns:
+            bytes: The n bytes read, or None on timeout
+        """
+        ser, rx = self.ser, self._rx
+        deadline = time.perf_counter() + timeout
+        while len(rx) < n:
+            waiting = ser.in_waiting
+            if waiting:
+                rx += ser.read(waiting)
+                continue
+            if time.perf_counter() > deadline:
+                return None
+            time.sleep(0)  # Yield the GIL (e.g. to an OPM worker thread) without sleeping
+        data = bytes(rx[:n])
+        del rx[:n]
+        return data
+    
     def read_response(self):
         """
         Read a response from the MCU (non-blocking).
@@ -146,13 +645,57 @@ class SerialController:
         Returns:
             str: Response line if available, None otherwise
         """
-        if self.ser.in_waiting > 0:
-            try:
-                line = self.ser.readline().decode().strip()
-                return line if line else None
-            except (UnicodeDecodeError, serial.SerialException):
+        rx = self._rx
+        try:
+            waiting = self.ser.in_waiting
+            if waiting:
+                rx += self.ser.read(waiting)
+        except serial.SerialException:
+            return None
+        i = rx.find(b"\n")
+        if i < 0:
+            return None
+        line = bytes(rx[:i + 1]).decode(errors='ignore').strip()
+        del rx[:i + 1]
+        return line if line else None
+    
+    def fileno(self):
+        """
+        File descriptor of the open port (POSIX), so the controller can be passed
+        to select(), a selector or loop.add_reader() next to other sources;
+        call read_response() once it is readable.
+        
+        Returns:
+            int: The port's file descriptor, or None where the port has none (Windows)
+        """
+        return self._fd if self._sel is not None else None
+    
+    def await_response_fd(self, timeout=2.0):
+        """
+        Wait for a response line by blocking in select() on the port.
+        
+        The thread sleeps in the kernel and wakes as soon as bytes arrive. Where
+        the port has no file descriptor (Windows) it polls every 500 µs instead.
+        
+        Args:
+            timeout (float): Maximum time to wait in seconds
+        
+        Returns:
+            str: Response line if received, None if timeout
+        """
+        deadline = time.perf_counter() + timeout
+        fds = [self._fd] if self._sel is not None else None
+        while True:
+            line = self.read_response()
+            if line is not None:
+                return line
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
                 return None
-        return None
+            if fds:
+                select.select(fds, [], [], remaining)
+            else:
+                time.sleep(min(0.0005, remaining))
     
     def check_communication(self, timeout=2.0, verbose=None):
         """
@@ -172,15 +715,10 @@ class SerialController:
             print("Checking communication with MCU...")
         
         # Clear any leftover data in input buffer
-        self.ser.reset_input_buffer()
-        
-        # Send COMM_OK command
-        message = "COMM_OK\n"
-        self.ser.write(message.encode())
-        self.ser.flush()  # Ensure data is sent immediately
+        self._reset_input()
         
-        # Wait for response
-        response = self.wait_for_mcu_response(timeout)
+        # Send COMM_OK command and wait for the response
+        response = self._request(b"COMM_OK\n", timeout)
         
         if response:
             # Check if response contains "COMM_OK" or "OK"
@@ -198,8 +736,25 @@ class SerialController:
             return False
 
     def close(self):
-        """Close the serial connection."""
-        if self.ser and self.ser.is_open:
+        """
+        Close the serial connection. A port opened by several controllers is
+        closed by the last of them; a shared_port is left open for its owner.
+        """
+        if self._sel is not None:
+            self._sel.close()
+            self._sel = None
+        if self._bus_key is None:
+            return
+        with _BUSES_LOCK:
+            bus = _BUSES.get(self._bus_key)
+            last = bus is None or bus[1] <= 1
+            if bus is not None:
+                if last:
+                    del _BUSES[self._bus_key]
+                else:
+                    bus[1] -= 1
+            self._bus_key = None
+        if last and self.ser and self.ser.is_open:
             self.ser.close()
             if self.verbose:
                 print("Serial connection closed.")
@@ -218,19 +773,102 @@ class DACController(SerialController):
     Controller class for communicating with STM32 MCU to control MCP4728 DAC via UART.
     """
     
-    def __init__(self, port="COM3", baud=115200, auto_connect=True, verbose=True):
+    def __init__(self, port="COM3", baud=460800, auto_connect=True, verbose=True, shared_port=None,
+                 reset_mcu=False, log_path=None, reset_wait=2.0):
         """
         Initialize the DAC controller.
         
         Args:
             port (str): Serial port name (e.g., "COM3", "/dev/ttyUSB0")
-            baud (int): Baud rate (default: 115200)
+            baud (int): Baud rate (default: 460800)
             auto_connect (bool): Automatically connect on initialization
             verbose (bool): Print connection messages
+            shared_port (serial.Serial): Already-open port shared with other controllers
+            reset_mcu (bool): Reset the MCU through DTR/RTS when opening the port
+            reset_wait (float): Longest wait for the MCU after opening; 0 skips the handshake
+            log_path (str): Optional CSV file that records every DAC write (see start_log)
+        """
+        super().__init__(port, baud, auto_connect, verbose, shared_port, reset_mcu, reset_wait)
+        
+        # Only 4 x 4096 distinct commands exist; they are encoded once at import.
+        # Single-channel sets go out as 5-byte binary frames rather than text.
+        self._set_ack_bytes = _SET_ACK_BYTES
+        self._set_one_bytes = _SET_ONE_BYTES
+        self._set_all_bytes = _SET_ALL_BYTES
+        
+        # Pipelined writes: the MCU acknowledges every _credit "pset" commands
+        # with one "ACK16" line instead of answering each one. A full window
+        # (16 commands of at most 12 bytes) fits the firmware's 256-byte receive
+        # ring, so the host never outruns the MCU.
+        self._unacked = 0
+        self._credit = 16
+        self._ack_bytes = f"ACK{self._credit}\r\n".encode('ascii')
+        
+        self._log_q = None
+        self._log_thread = None
+        if log_path is not None:
+            self.start_log(log_path)
+    
+    def start_log(self, path):
+        """
+        Record every DAC write to a CSV file ("time_s,channel,dac_value" lines).
+        
+        Writers only put a tuple on a queue; a background thread formats the
+        lines and writes them through a 64 KiB buffer, so logging never holds up
+        the serial writes of a sweep. Times are time.perf_counter() values.
+        
+        Args:
+            path (str): File to append to
         """
-        super().__init__(port, baud, auto_connect, verbose)
+        self.stop_log()
+        log_file = open(path, "ab", buffering=65536)
+        self._log_q = queue.SimpleQueue()
+        self._log_thread = threading.Thread(target=self._log_worker, args=(self._log_q, log_file),
+                                            daemon=True)
+        self._log_thread.start()
+    
+    def stop_log(self):
+        """Stop logging, flushing everything queued so far to the file."""
+        if self._log_q is None:
+            return
+        self._log_q.put(None)
+        self._log_thread.join()
+        self._log_q = None
+        self._log_thread = None
+    
+    @staticmethod
+    def _log_worker(log_q, log_file):
+        """Drain (time, channels, codes) records from log_q into log_file until None."""
+        with log_file:
+            while True:
+                record = log_q.get()
+                if record is None:
+                    return
+                t, channels, codes = record
+                # Table lookups instead of int-to-str conversions, since this
+                # thread holds the GIL while the sweep is running
+                t = b"%.6f," % t
+                log_file.write(b"".join(t + _CH_STR[ch] + _DAC_STR[v] + b"\n"
+                                        for ch, v in zip(channels, codes)))
+    
+    def _log(self, channels, codes):
+        """Queue one write of codes to channels for the log thread, if logging."""
+        if self._log_q is not None:
+            self._log_q.put_nowait((time.perf_counter(), channels, codes))
     
-    def set_dac(self, channel, dac_value, verbose=None, wait_for_response=True, timeout=2.0):
+    def _log_steps(self, channels, step_codes):
+        """Queue a streamed run of steps, all stamped with the time the stream finished."""
+        if self._log_q is not None:
+            t = time.perf_counter()
+            for codes in step_codes:
+                self._log_q.put_nowait((t, channels, codes))
+    
+    def close(self):
+        """Stop the write log, then close the serial connection."""
+        self.stop_log()
+        super().close()
+    
+    def set_dac(self, channel, dac_value, verbose=None, wait_for_response=True, timeout=2.0, ack=True):
         """
         Set DAC value for a specific channel and wait for MCU acknowledgment.
         
@@ -240,6 +878,8 @@ class DACController(SerialController):
             verbose (bool): Print confirmation message (defaults to self.verbose)
             wait_for_response (bool): Wait for MCU response/acknowledgment
             timeout (float): Timeout in seconds when waiting for response
+            ack (bool): False streams the command without a per-command reply
+                (see set_dac_pipelined); call barrier() after the last one
         
         Returns:
             tuple: (success: bool, response: str) - success indicates if command was sent,
@@ -257,20 +897,19 @@ class DACController(SerialController):
             print(f"Error: DAC value must be 0-4095, got {dac_value}")
             return False, None
         
-        # Clear any leftover data in input buffer
-        self.ser.reset_input_buffer()
+        if not ack:
+            return self.set_dac_pipelined(int(channel), int(dac_value), timeout)
         
-        # Format: "channel,dac_value"
-        message = f"{channel},{dac_value}\n"
-        self.ser.write(message.encode())
-        self.ser.flush()  # Ensure data is sent immediately
+        # Binary SET_ACK frame: sync, opcode, channel, uint16 value
+        frame = self._set_ack_bytes[int(channel)][int(dac_value)]
+        self._log((channel,), (dac_value,))
         
         if verbose:
-            print(f"Sent: Channel {channel} = {dac_value}")
+            print(f"Sending: Channel {channel} = {dac_value}")
         
         # Wait for MCU response
         if wait_for_response:
-            response = self.wait_for_mcu_response(timeout)
+            response = self._request(frame, timeout)
             if response:
                 if verbose:
                     print(f"  MCU: {response}")
@@ -280,6 +919,7 @@ class DACController(SerialController):
                     print(f"  Warning: No response from MCU within {timeout}s")
                 return True, None  # Command sent but no response received
         
+        self._write(frame)
         return True, None
     
     def set_voltage(self, channel, voltage, vref=5.0, verbose=None, wait_for_response=True, timeout=2.0):
@@ -314,14 +954,10 @@ class DACController(SerialController):
             print(f"Error: Reference voltage must be > 0, got {vref}V")
             return False, None
         
-        # Convert voltage to DAC code: dac_value = (voltage / vref) * 4095
+        # Convert voltage to DAC code: dac_value = (voltage / vref) * 4095,
+        # clamped to the valid range (0-4095) in one expression
         dac_value = int((voltage / vref) * 4095)
-        
-        # Clamp to valid range (0-4095)
-        if dac_value < 0:
-            dac_value = 0
-        elif dac_value > 4095:
-            dac_value = 4095
+        dac_value = 0 if dac_value < 0 else (4095 if dac_value > 4095 else dac_value)
         
         if verbose:
             print(f"Setting channel {channel} to {voltage:.4f}V (DAC code: {dac_value})")
@@ -329,6 +965,365 @@ class DACController(SerialController):
         # Call set_dac with the converted value
         return self.set_dac(channel, dac_value, verbose=False, wait_for_response=wait_for_response, timeout=timeout)
     
+    def set_dacs(self, values, verbose=None, wait_for_response=True, timeout=2.0):
+        """
+        Set several DAC channels at once with one frame and one acknowledgment.
+        
+        All the channels change in the same DAC write, for one round-trip
+        instead of one per channel.
+        
+        Args:
+            values (list): Four DAC codes [ch0, ch1, ch2, ch3]; None leaves a channel unchanged
+            verbose (bool): Print confirmation message (defaults to self.verbose)
+            wait_for_response (bool): Wait for MCU response/acknowledgment
+            timeout (float): Timeout in seconds when waiting for response
+        
+        Returns:
+            tuple: (success: bool, response: str) - success indicates if command was sent,
+                   response contains MCU acknowledgment or None if timeout/error
+        """
+        if verbose is None:
+            verbose = self.verbose
+        
+        if len(values) != 4 or any(v is not None and not 0 <= v <= 4095 for v in values):
+            print(f"Error: values must be 4 DAC codes 0-4095 (or None), got {values}")
+            return False, None
+        
+        # Binary SET_MULTI_ACK frame: sync, opcode, channel mask, 4 x uint16 values
+        frame = self._set_multi_frame([None if v is None else int(v) for v in values], _OP_SET_MULTI_ACK)
+        self._log([ch for ch, v in enumerate(values) if v is not None], [v for v in values if v is not None])
+        
+        if verbose:
+            print(f"Sending: Channels = {list(values)}")
+        
+        # Wait for MCU response
+        if wait_for_response:
+            response = self._request(frame, timeout)
+            if response:
+                if verbose:
+                    print(f"  MCU: {response}")
+                return True, response
+            else:
+                if verbose:
+                    print(f"  Warning: No response from MCU within {timeout}s")
+                return True, None  # Command sent but no response received
+        
+        self._write(frame)
+        return True, None
+    
+    def set_voltages(self, voltages, vref=5.0, verbose=None, wait_for_response=True, timeout=2.0):
+        """
+        Set several DAC output voltages at once (see set_dacs).
+        
+        Args:
+            voltages (list): Four voltages in Volts [ch0, ch1, ch2, ch3] (0 to vref);
+                None leaves a channel unchanged
+            vref (float): Reference voltage in Volts (default: 5.0V for VDD)
+            verbose (bool): Print confirmation message (defaults to self.verbose)
+            wait_for_response (bool): Wait for MCU response/acknowledgment
+            timeout (float): Timeout in seconds when waiting for response
+        
+        Returns:
+            tuple: (success: bool, response: str) - as for set_dacs
+        """
+        if verbose is None:
+            verbose = self.verbose
+        
+        if vref <= 0:
+            print(f"Error: Reference voltage must be > 0, got {vref}V")
+            return False, None
+        
+        if len(voltages) != 4 or any(v is not None and not 0 <= v <= vref for v in voltages):
+            print(f"Error: voltages must be 4 values 0-{vref}V (or None), got {voltages}")
+            return False, None
+        
+        # Convert every voltage to a DAC code in one pass, clamped to 0-4095
+        codes = np.clip((np.array([v or 0.0 for v in voltages]) / vref * 4095).astype(np.int32), 0, 4095).tolist()
+        codes = [None if v is None else c for v, c in zip(voltages, codes)]
+        
+        if verbose:
+            print(f"Setting channels to {voltages}V (DAC codes: {codes})")
+        
+        return self.set_dacs(codes, verbose=False, wait_for_response=wait_for_response, timeout=timeout)
+    
+    def set_dac_pipelined(self, channel, dac_value, timeout=2.0):
+        """
+        Set DAC value for a channel without waiting for a per-command acknowledgment.
+        
+        Commands are streamed back-to-back; only after every 16th one does this
+        block until the MCU's "ACK16" credit line arrives, which keeps its
+        receive buffer from overflowing. Call barrier() to wait for the
+        remaining commands and collect I2C errors.
+        
+        Args:
+            channel (int): Channel number (0-3)
+            dac_value (int): DAC code value (0-4095)
+            timeout (float): Timeout in seconds when waiting for a credit ack
+        
+        Returns:
+            tuple: (success: bool, response: str) - response is the credit ack if
+                   one was consumed by this call, None otherwise
+        """
+        if not (0 <= channel <= 3 and 0 <= dac_value <= 4095):
+            print(f"Error: Channel must be 0-3 and DAC value 0-4095, got {channel}, {dac_value}")
+            return False, None
+        
+        self._log((channel,), (dac_value,))
+        return self._write_pipelined(self._set_one_bytes[channel][dac_value], timeout=timeout)
+    
+    def set_channels_pipelined(self, values, timeout=2.0):
+        """
+        Set several DAC channels with one binary frame, pipelined like set_dac_pipelined.
+        
+        Args:
+            values (list): Four DAC codes [ch0, ch1, ch2, ch3]; None leaves a channel unchanged
+            timeout (float): Timeout in seconds when waiting for a credit ack
+        
+        Returns:
+            tuple: (success: bool, response: str) - as for set_dac_pipelined
+        """
+        if len(values) != 4 or any(v is not None and not 0 <= v <= 4095 for v in values):
+            print(f"Error: values must be 4 DAC codes 0-4095 (or None), got {values}")
+            return False, None
+        
+        self._log([ch for ch, v in enumerate(values) if v is not None], [v for v in values if v is not None])
+        return self._write_pipelined(self._set_multi_frame(values), timeout=timeout)
+    
+    def set_dac_batch(self, setpoints, verbose=None, timeout=2.0):
+        """
+        Apply a list of single-channel setpoints in order, sent as one buffer.
+        
+        Every setpoint becomes a pipelined SET_ONE frame; the frames are encoded
+        together and written in packet-sized batches under the credit window,
+        followed by one barrier(), instead of a write and a reply per setpoint.
+        
+        Args:
+            setpoints (list): (channel, dac_value) pairs, applied in list order
+            verbose (bool): Print confirmation message (defaults to self.verbose)
+            timeout (float): Timeout in seconds when waiting for a credit ack or the sync reply
+        
+        Returns:
+            tuple: (success: bool, response: str) - as for barrier()
+        """
+        if verbose is None:
+            verbose = self.verbose
+        
+        points = np.asarray(setpoints, dtype=np.int64).reshape(-1, 2)
+        if len(points) == 0:
+            return True, None
+        if ((points[:, 0] < 0) | (points[:, 0] > 3) | (points[:, 1] < 0) | (points[:, 1] > 4095)).any():
+            print("Error: setpoints must be (channel 0-3, DAC value 0-4095) pairs")
+            return False, None
+        
+        # Encode every frame in one vectorized pass
+        frames = np.empty(len(points), dtype=_SET_ONE_DTYPE)
+        frames['sync'] = _BIN_SYNC
+        frames['op'] = _OP_SET_ONE
+        frames['ch'] = points[:, 0]
+        frames['val'] = points[:, 1]
+        
+        if self._log_q is not None:
+            for ch, v in points.tolist():
+                self._log((ch,), (v,))
+        if verbose:
+            print(f"Sending: {len(points)} setpoints in one batch")
+        
+        self._stream_frames(memoryview(frames.tobytes()), _SET_ONE_DTYPE.itemsize, len(points))
+        success, response = self.barrier(timeout)
+        if verbose:
+            print(f"  MCU: {response}")
+        return success, response
+    
+    @staticmethod
+    def _set_multi_frame(values, op=_OP_SET_MULTI):
+        """Pack one set-multi frame (SET_MULTI or SET_MULTI_ACK); None entries are masked out."""
+        mask = 0
+        for ch, v in enumerate(values):
+            if v is not None:
+                mask |= 1 << ch
+        return _SET_MULTI.pack(_BIN_SYNC, op, mask, *(v or 0 for v in values))
+    
+    @staticmethod
+    def _encode_multi_frames(step_values, mask):
+        """
+        Encode one SET_MULTI frame per row of step_values (steps x 4 DAC codes).
+        
+        Returns:
+            memoryview: All frames back-to-back, _SET_MULTI_DTYPE.itemsize bytes each
+        """
+        frames = np.empty(len(step_values), dtype=_SET_MULTI_DTYPE)
+        frames['sync'] = _BIN_SYNC
+        frames['op'] = _OP_SET_MULTI
+        frames['mask'] = mask
+        frames['val'] = step_values
+        return memoryview(frames.tobytes())
+    
+    def _stream_native(self, buf, size, holds=None):
+        """
+        Send pipelined frames through the compiled _sweep_core loop if it can be used.
+        
+        It writes straight to the port's file descriptor and reads the credit
+        acks from it, so it needs the POSIX fd path and an empty receive buffer.
+        Paced sweeps that log every step stay in Python.
+        
+        Args:
+            buf (memoryview): Contiguous frames, size bytes each
+            size (int): Bytes per frame
+            holds (np.ndarray): Seconds to hold each frame, or None for unpaced
+        
+        Returns:
+            bool: True if the frames were sent, False to use the Python loop
+        """
+        if _sweep_core is None or self._sel is None or self._rx:
+            return False
+        if holds is not None and self._log_q is not None:
+            return False
+        with self._lock:
+            self._unacked, bad = _sweep_core.stream_frames(
+                self._fd, buf, size, holds, self._unacked, self._credit, self._ack_bytes)
+        if bad and self.verbose:
+            print(f"  Warning: {bad} ACK{self._credit} replies from the MCU were missing or corrupted")
+        return True
+    
+    def _stream_frames(self, buf, size, count):
+        """
+        Write count pipelined frames of size bytes from buf as fast as the credit
+        window allows, batching them so each write fills at least one USB packet.
+        """
+        if self._stream_native(buf, size):
+            return
+        # Smallest power of two that fills a packet, so batches divide the credit window
+        batch = 1
+        while batch * size < _USB_PACKET and batch < self._credit:
+            batch *= 2
+        write, credit = self._write_pipelined, self._credit
+        i = 0
+        while i < count:
+            n = min(batch, credit - self._unacked, count - i)
+            write(buf[i * size:(i + n) * size], n)
+            i += n
+    
+    def _write_pipelined(self, data, count=1, timeout=2.0):
+        """
+        Write pipelined commands and consume the credit ack when the window is full.
+        
+        Args:
+            data (bytes): One or more encoded commands
+            count (int): Number of commands in data; must not overrun the credit window
+            timeout (float): Timeout in seconds when waiting for a credit ack
+        """
+        with self._lock:
+            self._write(data)
+            self._unacked += count
+            if self._unacked < self._credit:
+                return True, None
+            
+            # The credit ack has a known size, so spin for it rather than block
+            response = self.read_response_fast(len(self._ack_bytes), timeout)
+            # Start a fresh window either way so a lost ack can't stall every later write
+            self._unacked = 0
+        if response != self._ack_bytes:
+            if self.verbose:
+                print(f"  Warning: Expected ACK{self._credit} from MCU, got {response!r}")
+            return True, None
+        return True, response.decode().strip()
+    
+    def barrier(self, timeout=2.0, frames=b""):
+        """
+        Wait until the MCU has processed every pipelined command (set_dac with
+        ack=False, set_dac_pipelined, set_channels_pipelined and the sweeps).
+        
+        Args:
+            timeout (float): Timeout in seconds when waiting for the sync reply
+            frames (bytes): Pipelined frames to send in the same write as the sync
+        
+        Returns:
+            tuple: (success: bool, response: str) - success is False if the MCU
+                   reported failed DAC writes or did not answer
+        """
+        with self._lock:
+            self._write(bytes(frames) + b"sync\n")
+            self._unacked = 0
+            # A credit ack may still be in flight ahead of the sync reply
+            response = self.wait_for_mcu_response(timeout)
+            while response is not None and response.startswith("ACK"):
+                response = self.wait_for_mcu_response(timeout)
+        
+        if response is None or not response.startswith("SYNC,"):
+            if self.verbose:
+                print(f"  Warning: No sync reply from MCU within {timeout}s")
+            return False, response
+        # Format: "SYNC,<commands since last ack>,<failed writes>"
+        try:
+            errors = int(response.split(",")[2])
+        except (IndexError, ValueError):
+            return False, response
+        if errors and self.verbose:
+            print(f"  Warning: {errors} pipelined DAC write(s) failed")
+        return errors == 0, response
+    
+    def warm_up(self, rounds=3):
+        """
+        Run a few no-op round-trips so the first real command isn't the slow one.
+        
+        The first writes and reads after opening a port (or changing its latency
+        settings) are slower than later ones while the driver and Python's
+        code paths warm up. "sync" changes no outputs and its reply has a known
+        form, so it serves as the no-op. Call after set_low_latency().
+        
+        Args:
+            rounds (int): Number of round-trips
+        
+        Returns:
+            bool: True if every round-trip was answered
+        """
+        return all([self.barrier()[1] is not None for _ in range(rounds)])
+    
+    @staticmethod
+    def _report_steps(steps, every=100):
+        """Steps that sweeps summarize in verbose mode: every every-th (none if 0) and the last."""
+        if every <= 0:
+            return [steps - 1]
+        return sorted(set(range(0, steps, every)) | {steps - 1})
+    
+    @staticmethod
+    def _coalesce_steps(step_values):
+        """
+        Find runs of consecutive steps that land on the same DAC codes.
+        
+        Args:
+            step_values (np.ndarray): DAC codes per step (1-D, or steps x channels)
+        
+        Returns:
+            tuple: (starts, runs) - index of the first step of each run and the
+                   number of steps it lasts; only the first step needs a frame
+        """
+        changed = np.diff(step_values, axis=0) != 0
+        if changed.ndim > 1:
+            changed = changed.any(axis=1)
+        starts = np.flatnonzero(np.concatenate(([True], changed)))
+        runs = np.diff(np.append(starts, len(step_values)))
+        return starts, runs
+    
+    def _wait_step(self, deadline, delay):
+        """
+        Sleep until one step period after deadline and return the new deadline.
+        
+        Sweeps pace themselves against a monotonic deadline rather than sleeping
+        delay after the work, so the step period stays at delay however long the
+        UART write and printing take. If the loop falls more than one period
+        behind, the schedule restarts from now instead of bursting to catch up.
+        """
+        deadline += delay
+        remaining = deadline - time.perf_counter()
+        if remaining > 0:
+            time.sleep(remaining)
+        elif delay > 0 and remaining < -delay:
+            if self.verbose:
+                print(f"  Warning: sweep fell {-remaining*1000:.1f} ms behind, resyncing")
+            deadline = time.perf_counter()
+        return deadline
+    
     def set_all_channels(self, dac_value, verbose=None, wait_for_response=True, timeout=2.0):
         """
         Set all DAC channels to the same value and wait for MCU acknowledgment.
@@ -351,20 +1346,16 @@ class DACController(SerialController):
             print(f"Error: DAC value must be 0-4095, got {dac_value}")
             return False, None
         
-        # Clear any leftover data in input buffer
-        self.ser.reset_input_buffer()
-        
         # Format: "set_all,dac_value"
-        message = f"set_all,{dac_value}\n"
-        self.ser.write(message.encode())
-        self.ser.flush()  # Ensure data is sent immediately
+        frame = self._set_all_bytes[int(dac_value)]
+        self._log(range(4), (dac_value,) * 4)
         
         if verbose:
-            print(f"Sent: All channels = {dac_value}")
+            print(f"Sending: All channels = {dac_value}")
         
         # Wait for MCU response
         if wait_for_response:
-            response = self.wait_for_mcu_response(timeout)
+            response = self._request(frame, timeout)
             if response:
                 if verbose:
                     print(f"  MCU: {response}")
@@ -374,10 +1365,11 @@ class DACController(SerialController):
                     print(f"  Warning: No response from MCU within {timeout}s")
                 return True, None  # Command sent but no response received
         
+        self._write(frame)
         return True, None
     
     
-    def sweep_channel(self, channel, start_value, end_value, steps, delay=0.1):
+    def sweep_channel(self, channel, start_value, end_value, steps, delay=0.1, progress_every=100):
         """
         Sweep a DAC channel from start_value to end_value.
         
@@ -387,32 +1379,70 @@ class DACController(SerialController):
             end_value (int): Ending DAC value (0-4095)
             steps (int): Number of steps in the sweep
             delay (float): Delay between steps in seconds
+            progress_every (int): In verbose mode, report every progress_every-th step
+                after the sweep (0: only the last step)
         """
         if steps < 1:
             print("Error: Steps must be >= 1")
             return
+        if channel < 0 or channel > 3:
+            print(f"Error: Channel must be 0-3, got {channel}")
+            return
+        if not (0 <= start_value <= 4095 and 0 <= end_value <= 4095):
+            print("Error: DAC values must be 0-4095")
+            return
         
-        step_size = (end_value - start_value) / (steps - 1) if steps > 1 else 0
-        
-        print(f"Sweeping channel {channel} from {start_value} to {end_value} in {steps} steps...")
-        
-        for i in range(steps):
-            dac_value = int(start_value + i * step_size)
-            success, response = self.set_dac(channel, dac_value, verbose=False, wait_for_response=True)
-            print(f"  Step {i+1}/{steps}: Channel {channel} = {dac_value}", end="")
-            if response:
-                print(f" - {response}")
-            else:
-                print()
-            time.sleep(delay)
-    def sweep_up_and_down(self, channel, start_value, end_value, steps, delay=0.1):
+        if self.verbose:
+            print(f"Sweeping channel {channel} from {start_value} to {end_value} in {steps} steps...")
+        
+        # Steps that round to the code already on the output are not resent;
+        # the previous frame is held for the whole run instead
+        values = np.linspace(start_value, end_value, steps).astype(np.uint16)
+        starts, runs = self._coalesce_steps(values)
+        
+        # Encode every frame in one vectorized pass
+        frames = np.empty(len(starts), dtype=_SET_ONE_DTYPE)
+        frames['sync'] = _BIN_SYNC
+        frames['op'] = _OP_SET_ONE
+        frames['ch'] = channel
+        frames['val'] = values[starts]
+        buf = memoryview(frames.tobytes())
+        size = _SET_ONE_DTYPE.itemsize
+        
+        channels = (channel,)
+        step_codes = values[starts, None]
+        if delay <= 0:
+            # Unpaced: push the frames out in packet-sized batches
+            self._stream_frames(buf, size, len(starts))
+            self._log_steps(channels, step_codes)
+        elif not self._stream_native(buf, size, delay * runs):
+            # No compiled loop: bind the per-step callables and frame slices up
+            # front so the paced Python loop does no attribute lookups or slicing
+            write, wait_step = self._write_pipelined, self._wait_step
+            log = self._log if self._log_q is not None else None
+            step_frames = [buf[i * size:(i + 1) * size] for i in range(len(starts))]
+            deadline = time.perf_counter()
+            for frame, run, codes in zip(step_frames, runs.tolist(), step_codes):
+                write(frame)
+                if log:
+                    log(channels, codes)
+                deadline = wait_step(deadline, delay * run)
+        
+        success, response = self.barrier()
+        if self.verbose:
+            # Report after the sweep so console writes never delay a step
+            print("\n".join(f"  Step {i+1}/{steps}: Channel {channel} = {values[i]}"
+                            for i in self._report_steps(steps, progress_every)))
+            print(f"  MCU: {response}")
+    
+    def sweep_up_and_down(self, channel, start_value, end_value, steps, delay=0.1, progress_every=100):
         """
         Sweep a DAC channel from start_value to end_value and back to start_value.
         """
-        self.sweep_channel(channel, start_value, end_value, steps, delay)
-        self.sweep_channel(channel, end_value, start_value, steps, delay)
+        self.sweep_channel(channel, start_value, end_value, steps, delay, progress_every)
+        self.sweep_channel(channel, end_value, start_value, steps, delay, progress_every)
         
-    def sweep_all_channels(self, start_values, end_values, steps, delay=0.1):
+    def sweep_all_channels(self, start_values, end_values, steps, delay=0.1, progress_every=100):
         """
         Sweep all 4 channels simultaneously.
         
@@ -421,27 +1451,56 @@ class DACController(SerialController):
             end_values (list): Ending DAC values for each channel [ch0, ch1, ch2, ch3]
             steps (int): Number of steps in the sweep
             delay (float): Delay between steps in seconds
+            progress_every (int): In verbose mode, report every progress_every-th step
+                after the sweep (0: only the last step)
         """
         if len(start_values) != 4 or len(end_values) != 4:
             print("Error: start_values and end_values must have 4 elements")
             return
+        if steps < 1:
+            print("Error: Steps must be >= 1")
+            return
+        if not all(0 <= v <= 4095 for v in list(start_values) + list(end_values)):
+            print("Error: DAC values must be 0-4095")
+            return
         
-        print(f"Sweeping all channels in {steps} steps...")
-        
-        for i in range(steps):
-            for ch in range(4):
-                start_val = start_values[ch]
-                end_val = end_values[ch]
-                step_size = (end_val - start_val) / (steps - 1) if steps > 1 else 0
-                dac_value = int(start_val + i * step_size)
-                self.set_dac(ch, dac_value, verbose=False, wait_for_response=False)
-            print(f"  Step {i+1}/{steps}: Ch0={int(start_values[0] + i*(end_values[0]-start_values[0])/(steps-1))}, "
-                  f"Ch1={int(start_values[1] + i*(end_values[1]-start_values[1])/(steps-1))}, "
-                  f"Ch2={int(start_values[2] + i*(end_values[2]-start_values[2])/(steps-1))}, "
-                  f"Ch3={int(start_values[3] + i*(end_values[3]-start_values[3])/(steps-1))}")
-            time.sleep(delay)
+        if self.verbose:
+            print(f"Sweeping all channels in {steps} steps...")
+        
+        # One binary frame per step carries all four channels; rows are steps.
+        # Steps where no channel changes code are held rather than resent.
+        step_values = np.linspace(start_values, end_values, steps).astype(np.uint16)
+        starts, runs = self._coalesce_steps(step_values)
+        buf = self._encode_multi_frames(step_values[starts], 0x0F)
+        size = _SET_MULTI_DTYPE.itemsize
+        
+        channels = range(4)
+        step_codes = step_values[starts]
+        if delay <= 0:
+            # Unpaced: push the frames out in packet-sized batches
+            self._stream_frames(buf, size, len(starts))
+            self._log_steps(channels, step_codes)
+        elif not self._stream_native(buf, size, delay * runs):
+            # No compiled loop: bind the per-step callables and frame slices up
+            # front so the paced Python loop does no attribute lookups or slicing
+            write, wait_step = self._write_pipelined, self._wait_step
+            log = self._log if self._log_q is not None else None
+            step_frames = [buf[i * size:(i + 1) * size] for i in range(len(starts))]
+            deadline = time.perf_counter()
+            for frame, run, codes in zip(step_frames, runs.tolist(), step_codes):
+                write(frame)
+                if log:
+                    log(channels, codes)
+                deadline = wait_step(deadline, delay * run)
+        
+        self.barrier()
+        if self.verbose:
+            print("\n".join(f"  Step {i+1}/{steps}: Ch0={step_values[i][0]}, Ch1={step_values[i][1]}, "
+                            f"Ch2={step_values[i][2]}, Ch3={step_values[i][3]}"
+                            for i in self._report_steps(steps, progress_every)))
 
-    def sweep_channels_independent(self, channel_configs, delay=0.1):
+    def sweep_channels_independent(self, channel_configs, delay=0.1, opm=None, opm_channels=None,
+                                   progress_every=100):
         """
         Sweep multiple channels independently with different directions and ranges simultaneously.
         
@@ -455,6 +1514,16 @@ class DACController(SerialController):
                 }
                 Channels can sweep upward (start < end) or downward (start > end)
             delay (float): Delay between steps in seconds
+            opm: Optional KeysightOPM instance to read at every step (after the delay);
+                the read is serial with the steps, since the meter must measure
+                while the step is held
+            opm_channels (list): OPM channels to read (1-based, default: [1])
+            progress_every (int): In verbose mode, report every progress_every-th step
+                after the sweep (0: only the last step)
+        
+        Returns:
+            list: Per-step OPM readings [[p_ch_a, p_ch_b, ...], ...] if opm is given, else None;
+                  failed channel reads are NaN
         
         Example:
             # Channel 0: 0 to 100 (upward), Channel 1: 1000 to 2000 (upward), Channel 3: 2000 to 10 (downward)
@@ -486,45 +1555,85 @@ class DACController(SerialController):
         # Find maximum number of steps
         max_steps = max(config['steps'] for config in channel_configs)
         
-        print(f"Sweeping {len(channel_configs)} channels independently in {max_steps} steps...")
-        for config in channel_configs:
-            direction = "up" if config['start'] < config['end'] else "down"
-            print(f"  Channel {config['channel']}: {config['start']} → {config['end']} ({direction}, {config['steps']} steps)")
-        
-        # Initialize channel values
-        channel_values = {}
+        if self.verbose:
+            print(f"Sweeping {len(channel_configs)} channels independently in {max_steps} steps...")
+            for config in channel_configs:
+                direction = "up" if config['start'] < config['end'] else "down"
+                print(f"  Channel {config['channel']}: {config['start']} → {config['end']} ({direction}, {config['steps']} steps)")
+        
+        # One all-channel OPM read per step, indexed by the requested channels
+        opm_readings = None
+        if opm is not None:
+            if opm_channels is None:
+                opm_channels = [1]
+            opm_index = [ch - 1 for ch in opm_channels]
+            opm_readings = []
+        
+        # One binary frame per step updates every swept channel at once;
+        # channels that aren't swept are masked out and keep their output.
+        # Every channel's ramp is written straight into its column: clamping the
+        # step index at the ramp's last step makes shorter ramps hold their
+        # final value, so nothing is padded or checked per step.
+        step_values = np.zeros((max_steps, 4), dtype=np.uint16)
+        step_index = np.arange(max_steps)
+        mask = 0
         for config in channel_configs:
-            channel_values[config['channel']] = config['start']
+            last = config['steps'] - 1
+            if last:
+                ramp = np.linspace(config['start'], config['end'], config['steps']).astype(np.uint16)
+            else:
+                # Single step - use end value
+                ramp = np.array([config['end']], dtype=np.uint16)
+            step_values[:, config['channel']] = ramp[np.minimum(step_index, last)]
+            mask |= 1 << config['channel']
+        channels = [ch for ch in range(4) if mask >> ch & 1]
+        buf = self._encode_multi_frames(step_values, mask)
+        size = _SET_MULTI_DTYPE.itemsize
+        step_codes = step_values[:, channels]
         
         # Perform sweep
-        for step in range(max_steps):
-            # Calculate current value for each channel
-            for config in channel_configs:
-                if config['steps'] > 1:
-                    # Calculate progress (0.0 to 1.0)
-                    progress = step / (config['steps'] - 1)
-                    if progress > 1.0:
-                        progress = 1.0
-                    
-                    # Interpolate value
-                    channel_values[config['channel']] = int(
-                        config['start'] + progress * (config['end'] - config['start'])
-                    )
+        if opm is None and delay <= 0:
+            # Unpaced: push the frames out in packet-sized batches
+            self._stream_frames(buf, size, max_steps)
+            self._log_steps(channels, step_codes)
+        elif opm is not None or not self._stream_native(buf, size, np.full(max_steps, float(delay))):
+            # Pick the loop for this configuration once, so the per-step body
+            # carries no OPM or logging branches
+            log = self._log if self._log_q is not None else None
+            step_frames = [buf[i * size:(i + 1) * size] for i in range(max_steps)]
+            if opm is not None:
+                for frame, codes in zip(step_frames, step_codes):
+                    # Send the step and the sync in one write, so the MCU has
+                    # applied it when the reply arrives; let the outputs
+                    # settle, then read the meter while the step is held
+                    self.barrier(frames=frame)
+                    if log:
+                        log(channels, codes)
+                    time.sleep(delay)
+                    # get_power_all reuses its array, so copy the values out now
+                    powers = opm.get_power_all()
+                    opm_readings.append([float(powers[i]) for i in opm_index])
+            else:
+                write, wait_step = self._write_pipelined, self._wait_step
+                deadline = time.perf_counter()
+                if log is None:
+                    for frame in step_frames:
+                        write(frame)
+                        deadline = wait_step(deadline, delay)
                 else:
-                    # Single step - use end value
-                    channel_values[config['channel']] = config['end']
-            
-            # Update all channels simultaneously
-            for channel, value in channel_values.items():
-                self.set_dac(channel, value, verbose=False, wait_for_response=False)
-            
-            # Print status
-            values_str = ", ".join([f"Ch{ch}={val}" for ch, val in sorted(channel_values.items())])
-            print(f"  Step {step+1}/{max_steps}: {values_str}")
-            
-            time.sleep(delay)
+                    for frame, codes in zip(step_frames, step_codes):
+                        write(frame)
+                        log(channels, codes)
+                        deadline = wait_step(deadline, delay)
+        
+        self.barrier()
         
-        print("Sweep complete!")
+        if self.verbose:
+            for step in self._report_steps(max_steps, progress_every):
+                values_str = ", ".join([f"Ch{ch}={step_values[step, ch]}" for ch in channels])
+                print(f"  Step {step+1}/{max_steps}: {values_str}")
+            print("Sweep complete!")
+        return opm_readings
 
 
 class ADCController(SerialController):
@@ -532,19 +1641,34 @@ class ADCController(SerialController):
     Controller class for reading voltages and currents from ADS1115 ADC via STM32 MCU.
     """
     
-    def __init__(self, port="COM3", baud=115200, auto_connect=True, verbose=True, shunt_resistors=[1.0, 1.0, 1.0, 1.0]):
+    def __init__(self, port="COM3", baud=460800, auto_connect=True, verbose=True, shunt_resistors=[1.0, 1.0, 1.0, 1.0],
+                 shared_port=None, binary=False, reset_mcu=False, reset_wait=2.0):
         """
         Initialize the ADC controller.
         
         Args:
             port (str): Serial port name (e.g., "COM3", "/dev/ttyUSB0")
-            baud (int): Baud rate (default: 115200)
+            baud (int): Baud rate (default: 460800)
             auto_connect (bool): Automatically connect on initialization
             verbose (bool): Print connection messages
             shunt_resistors (list): Shunt resistor values in Ohms for each channel [ch0, ch1, ch2, ch3]
+            shared_port (serial.Serial): Already-open port shared with other controllers
+            binary (bool): Read the ADC with fixed-size binary frames ("read_adc_bin")
+                instead of ASCII voltages; needs firmware that supports the command
+            reset_mcu (bool): Reset the MCU through DTR/RTS when opening the port
+            reset_wait (float): Longest wait for the MCU after opening; 0 skips the handshake
         """
-        super().__init__(port, baud, auto_connect, verbose)
-        self.shunt_resistors = list(shunt_resistors)  # Make a copy
+        super().__init__(port, baud, auto_connect, verbose, shared_port, reset_mcu, reset_wait)
+        # A copy as an array, with reciprocals so currents are a multiply
+        self.shunt_resistors = np.array(shunt_resistors, dtype=np.float64)
+        self._inv_shunt = 1.0 / self.shunt_resistors
+        self.binary = binary
+        
+        # Encode the per-channel read commands once rather than on every read
+        self._read_adc_bytes = [f"read_adc,{ch}\n".encode('ascii') for ch in range(4)]
+        self._read_adc_bin_bytes = [f"read_adc_bin,{ch}\n".encode('ascii') for ch in range(4)]
+        # Cleared once the MCU fails to answer "read_all" (older firmware)
+        self._has_read_all = True
     
     def set_shunt_resistor(self, channel, value, verbose=None):
         """
@@ -567,6 +1691,7 @@ class ADCController(SerialController):
             return
         
         self.shunt_resistors[channel] = value
+        self._inv_shunt[channel] = 1.0 / value
         if verbose:
             print(f"Channel {channel} shunt resistor set to {value}Ω")
     
@@ -585,17 +1710,14 @@ class ADCController(SerialController):
             verbose = self.verbose
         
         # Clear any leftover data in input buffer
-        self.ser.reset_input_buffer()
+        self._reset_input()
         
         # Send test command
         message = "test_adc\n"
         if verbose:
             print("Testing ADC I2C communication...")
-        self.ser.write(message.encode())
-        self.ser.flush()
-        
         # Wait for MCU response
-        response = self.wait_for_mcu_response(timeout)
+        response = self._request(message.encode(), timeout)
         
         if response:
             if response.startswith("OK:"):
@@ -630,40 +1752,75 @@ class ADCController(SerialController):
             print(f"Error: Channel must be 0-3, got {channel}")
             return None
         
-        # Clear any leftover data in input buffer
-        self.ser.reset_input_buffer()
+        # No reset_input_buffer() here: connect() already dropped boot noise, and
+        # on a shared port it would discard a credit ack the DAC is still owed
+        if self.binary:
+            return self._read_voltage_binary(channel, verbose, timeout)
         
         # Format: "read_adc,channel"
-        message = f"read_adc,{channel}\n"
         if verbose:
             print(f"  Sending: read_adc,{channel}")
-        self.ser.write(message.encode())
-        self.ser.flush()
-        
-        # Wait for MCU response
-        response = self.wait_for_mcu_response(timeout)
-        
-        if response:
+        # Hold the port lock until the reply has been taken out of the buffer
+        with self._lock:
+            self._write(self._read_adc_bytes[channel])
+            
+            # Wait for MCU response, then parse it in place: float()/int() take the
+            # memoryview slices directly, so the line is never copied out
             try:
-                # Response might be "voltage,raw_adc" or just "voltage"
-                parts = response.split(',')
-                voltage = float(parts[0])
-                if len(parts) > 1:
-                    raw_adc = int(parts[1])
-                    if verbose:
-                        print(f"  Channel {channel} voltage: {voltage:.4f}V (raw ADC: {raw_adc})")
-                else:
-                    if verbose:
-                        print(f"  Channel {channel} voltage: {voltage:.4f}V (raw response: '{response}')")
+                idx = self._find_line(timeout)
+            except (OSError, serial.SerialException):
+                idx = -1
+            
+            rx = self._rx
+            if idx >= 0:
+                voltage = None
+                # The view must be released before the line is deleted from rx
+                with memoryview(rx) as mv:
+                    try:
+                        # Response might be "voltage,raw_adc" or just "voltage"
+                        comma = rx.find(b',', 0, idx)
+                        if comma >= 0:
+                            voltage = float(mv[:comma])
+                            raw_adc = int(mv[comma + 1:idx])
+                            if verbose:
+                                print(f"  Channel {channel} voltage: {voltage:.4f}V (raw ADC: {raw_adc})")
+                        else:
+                            voltage = float(mv[:idx])
+                            if verbose:
+                                print(f"  Channel {channel} voltage: {voltage:.4f}V (raw response: '{bytes(mv[:idx]).decode(errors='ignore').strip()}')")
+                    except ValueError:
+                        voltage = None
+                        if verbose:
+                            print(f"Error: Invalid response from MCU: '{bytes(mv[:idx]).decode(errors='ignore').strip()}'")
+                del rx[:idx + 1]
                 return voltage
-            except (ValueError, IndexError):
+            else:
+                # Drop whatever did arrive so a late reply can't answer the next command
+                self._reset_input()
                 if verbose:
-                    print(f"Error: Invalid response from MCU: '{response}'")
+                    print(f"Warning: No response from MCU within {timeout}s for channel {channel}")
                 return None
-        else:
+    
+    def _read_voltage_binary(self, channel, verbose, timeout):
+        """Binary-frame variant of read_voltage: 8 bytes back and no float parsing."""
+        if verbose:
+            print(f"  Sending: read_adc_bin,{channel}")
+        with self._lock:
+            self._write(self._read_adc_bin_bytes[channel])
+            frame = self._read_binary_frame(timeout)
+            if frame is None:
+                # Drop a partial or late frame so it can't answer the next command
+                self._reset_input()
+        if frame is None or frame[0] != channel:
             if verbose:
-                print(f"Warning: No response from MCU within {timeout}s for channel {channel}")
+                print(f"Warning: No valid ADC frame from MCU within {timeout}s for channel {channel}")
             return None
+        
+        raw_adc = frame[1]
+        voltage = raw_adc * _ADC_LSB_V
+        if verbose:
+            print(f"  Channel {channel} voltage: {voltage:.4f}V (raw ADC: {raw_adc})")
+        return voltage
     
     def read_current(self, channel, verbose=None, timeout=2.0):
         """
@@ -692,7 +1849,7 @@ class ADCController(SerialController):
         
         # Calculate current: I = V / R
         shunt_r = self.shunt_resistors[channel]
-        current = voltage / shunt_r
+        current = voltage * float(self._inv_shunt[channel])
         
         if verbose:
             print(f"Channel {channel} current: {current*1000:.3f}mA (V={voltage:.4f}V, R={shunt_r}Ω)")
@@ -725,6 +1882,78 @@ class ADCController(SerialController):
         
         return voltages
     
+    def read_all_voltages_batched(self, verbose=None, timeout=2.0):
+        """
+        Read voltages from all ADC channels with one "read_all" round-trip.
+        
+        Falls back to read_all_voltages() (one round-trip per channel) if the
+        MCU rejects the command (answers with anything but four voltages), and
+        keeps using it from then on. A timeout only fails this call.
+        
+        Args:
+            verbose (bool): Print confirmation message (defaults to self.verbose)
+            timeout (float): Timeout in seconds when waiting for response
+        
+        Returns:
+            list: List of voltages [ch0, ch1, ch2, ch3] in Volts, None values on error
+        """
+        if verbose is None:
+            verbose = self.verbose
+        
+        if self._has_read_all:
+            response = self._request(b"read_all\n", timeout, decode_text=False)
+            if response is None:
+                # The input was already purged on the timeout; keep the fast path
+                if verbose:
+                    print(f"  Warning: No response to read_all from MCU within {timeout}s")
+                return [None] * 4
+            try:
+                voltages = [float(v) for v in response.split(b',')]
+                if len(voltages) != 4:
+                    raise ValueError(response)
+            except ValueError:
+                if verbose:
+                    print(f"  MCU did not answer read_all ({response!r}); reading channels one by one")
+                self._has_read_all = False
+            else:
+                if verbose:
+                    print("All channel voltages:")
+                    for ch, v in enumerate(voltages):
+                        print(f"  Channel {ch}: {v:.4f}V")
+                return voltages
+        
+        return self.read_all_voltages(verbose=verbose, timeout=timeout)
+    
+    def read_all_currents_batched(self, verbose=None, timeout=2.0):
+        """
+        Read currents from all ADC channels with one "read_all" round-trip.
+        
+        Args:
+            verbose (bool): Print confirmation message (defaults to self.verbose)
+            timeout (float): Timeout in seconds when waiting for response
+        
+        Returns:
+            list: List of currents [ch0, ch1, ch2, ch3] in Amperes, None values on error
+        """
+        if verbose is None:
+            verbose = self.verbose
+        
+        voltages = self.read_all_voltages_batched(verbose=False, timeout=timeout)
+        if None in voltages:
+            currents = [v * r if v is not None else None for v, r in zip(voltages, self._inv_shunt.tolist())]
+        else:
+            currents = (np.asarray(voltages) * self._inv_shunt).tolist()
+        
+        if verbose:
+            print("All channel currents:")
+            for ch, i in enumerate(currents):
+                if i is not None:
+                    print(f"  Channel {ch}: {i*1000:.3f}mA (R={self.shunt_resistors[ch]}Ω)")
+                else:
+                    print(f"  Channel {ch}: Error")
+        
+        return currents
+    
     def read_all_currents(self, verbose=None, timeout=2.0):
         """
         Read currents from all ADC channels.
@@ -757,22 +1986,35 @@ class ADCController(SerialController):
 # ============================================================================
 
 if __name__ == "__main__":
-    # Create controller instance
-    dac = DACController(port="COM3", baud=115200, verbose=True)
+    # Keep the scheduler from preempting sweep steps
+    raise_priority()
     
-    # Print initialization message
-    print("Connected to STM32 on", dac.port)
-    print("Ready to control DAC channels.")
+    # Open the port once; the DAC and ADC controllers share it
+    port = open_port("COM3", 460800, timeout=1)
+    dac = DACController(shared_port=port, verbose=True)
+    dac.set_low_latency()  # Before the first handshake, so every round-trip benefits
+    dac.wait_until_ready()
+    dac.warm_up()
     
     # Check communication on startup
-    if dac.check_communication(verbose=True):
-        print("Communication verified!\n")
-    else:
-        print("Warning: Communication check failed. MCU may not be ready.\n")
+    comm_ok = dac.check_communication(verbose=True)
+    
+    # Print the initialization banner with one write instead of a print per line
+    banner = f"""Connected to STM32 on {dac.port}
+Ready to control DAC channels.
+{"Communication verified!" if comm_ok else "Warning: Communication check failed. MCU may not be ready."}
+
+"""
+    sys.stdout.write(banner)
+    sys.stdout.flush()
+    
+    # Setup is done; from here on keep sweeps free of console output
+    dac.verbose = False
     
     # print("Available methods:")
     # print("  - dac.check_communication()  # Verify MCU communication")
     # print("  - dac.set_dac(channel, dac_value)")
+    # print("  - dac.set_dac(channel, dac_value, ack=False); ...; dac.barrier()  # Streamed writes, one final ACK")
     # print("  - dac.set_all_channels(dac_value)  # Set all channels to same value")
     # print("  - dac.sweep_channel(channel, start, end, steps, delay)")
     # print("  - dac.sweep_all_channels([start0,start1,start2,start3], [end0,end1,end2,end3], steps, delay)")
@@ -789,23 +2031,17 @@ if __name__ == "__main__":
     # ============================================================================
     
     # Example: Set DAC channel 0 to 1000 and read current from ADC channel 0
-    if dac.check_communication():
-        print("Communication verified!")
-        time.sleep(1)
-        
+    # (reuses the startup check rather than pinging the MCU again)
+    if comm_ok:
         # Set DAC channel 0 to 1000
         print("Setting DAC channel 0 to 1000...")
         dac.set_dac(0, 1000)
         time.sleep(0.2)  # Wait for DAC to settle (increased delay)
         
-        # Close DAC controller to free the serial port
-        dac.close()
-        time.sleep(0.5)  # Brief pause before reopening port
-        
-        # Create ADC controller to read current
+        # ADC controller on the same open port, so there is no close and reopen
         # Note: Set shunt resistor value (in Ohms) for current calculation
         # IMPORTANT: Update shunt_resistors to match your hardware!
-        adc = ADCController(port="COM3", baud=115200, 
+        adc = ADCController(shared_port=port,
                            shunt_resistors=[200.0, 200.0, 200.0, 200.0],  # 200Ω shunt resistors (update to match your hardware)
                            verbose=True)
         
@@ -825,13 +2061,15 @@ if __name__ == "__main__":
                 print("   - ADS1115 power (VDD, GND)")
                 print("   - ADS1115 I2C address (ADDR pin to GND = 0x48)")
                 print("   - Pull-up resistors on I2C lines (typically 4.7kΩ)")
-                adc.close()
+                dac.close()
+                port.close()
                 exit()
             
             # Test reading voltage from all channels
             print("\nStep 2: Testing ADC voltage readings on all channels...")
-            for ch in range(4):
-                voltage = adc.read_voltage(ch, verbose=True, timeout=3.0)
+            # One read_all round-trip for the four channels
+            voltages = adc.read_all_voltages_batched(verbose=False, timeout=3.0)
+            for ch, voltage in enumerate(voltages):
                 if voltage is not None:
                     print(f"  Channel {ch}: {voltage:.4f}V")
                 else:
@@ -845,7 +2083,8 @@ if __name__ == "__main__":
             
             if current is not None:
                 print(f"\n✓ Success! Current: {current*1000:.3f}mA")
-                print(f"  (Voltage: {adc.read_voltage(0, verbose=False, timeout=2.0):.4f}V, "
+                # The shunt voltage behind the current, without reading the ADC again
+                print(f"  (Voltage: {current * adc.shunt_resistors[0]:.4f}V, "
                       f"Shunt R: {adc.shunt_resistors[0]}Ω)")
             else:
                 print("\n✗ Failed to read current")
@@ -856,13 +2095,14 @@ if __name__ == "__main__":
                 print("  4. Verify DAC output is connected to the circuit")
                 print("  5. Check if ADC is initialized in STM32 code")
             
-            adc.close()
         else:
             print("ADC communication check failed.")
-            adc.close()
+        dac.close()
+        port.close()
     else:
         print("Communication check failed. MCU may not be ready.")
         dac.close()
+        port.close()
         exit()
 
 
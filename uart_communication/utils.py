@@ -6,10 +6,32 @@ import numpy as np
 import matplotlib.pyplot as plt
 import csv
 import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
 from datetime import datetime
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Sequence, Union
 import time
 
+# Sweep data as the Electrical methods accept it: NumPy arrays are used as-is
+FloatArray = Union[np.ndarray, Sequence[float]]
+
+
+def _enable_low_latency(*controllers):
+    """
+    Put each controller's serial port into low-latency mode, once per port.
+    
+    connect() only does this for ports it opens itself, so controllers built on
+    a shared_port would otherwise wait out the adapter's 16 ms latency timer on
+    every read of a sweep.
+    """
+    seen = set()
+    for ctrl in controllers:
+        ser = getattr(ctrl, 'ser', None)
+        if ser is None or id(ser) in seen or not hasattr(ctrl, 'set_low_latency'):
+            continue
+        seen.add(id(ser))
+        ctrl.set_low_latency(True)
+
 
 class Electrical:
     """
@@ -54,10 +76,24 @@ class Electrical:
             return 0.0
         return voltage / shunt_r
     
-    def analyze_iv_curve(self, voltages: List[float], currents: List[float]) -> Dict:
+    def calculate_currents_from_shunt(self, voltages: FloatArray, channel: int) -> np.ndarray:
+        """Calculate currents for a whole array of shunt voltages on one channel at once."""
+        voltages = np.asarray(voltages, dtype=np.float64)
+        if channel < 0 or channel >= len(self.shunt_resistors) or self.shunt_resistors[channel] == 0:
+            return np.zeros_like(voltages)
+        return voltages / self.shunt_resistors[channel]
+    
+    def analyze_iv_curve(self, voltages: FloatArray, currents: FloatArray,
+                         fields: Optional[set] = None) -> Dict:
         """
         Analyze IV curve and return key parameters.
         
+        Args:
+            voltages: Voltages of the curve (list or array; arrays are not copied)
+            currents: Currents of the curve (list or array; arrays are not copied)
+            fields: Keys to compute and return (default: all of them); leaving out
+                'resistances' and 'powers' skips building the per-point lists
+        
         Returns:
             Dictionary with: resistances, powers, max_power, max_power_voltage,
             max_power_current, open_circuit_voltage, short_circuit_current
@@ -65,29 +101,64 @@ class Electrical:
         if len(voltages) != len(currents):
             raise ValueError("Voltages and currents must have the same length")
         
-        resistances = [self.calculate_resistance(v, i) for v, i in zip(voltages, currents)]
-        powers = [self.calculate_power(v, i) for v, i in zip(voltages, currents)]
-        
-        max_power_idx = np.argmax(powers)
-        max_power = powers[max_power_idx]
-        
-        # Estimate open circuit voltage (point closest to zero current)
-        zero_current_idx = np.argmin(np.abs(currents)) if currents else 0
-        open_circuit_voltage = voltages[zero_current_idx]
-        
-        # Estimate short circuit current (point closest to zero voltage)
-        zero_voltage_idx = np.argmin(np.abs(voltages)) if voltages else 0
-        short_circuit_current = currents[zero_voltage_idx]
-        
-        return {
-            'resistances': resistances,
-            'powers': powers,
-            'max_power': max_power,
-            'max_power_voltage': voltages[max_power_idx],
-            'max_power_current': currents[max_power_idx],
-            'open_circuit_voltage': open_circuit_voltage,
-            'short_circuit_current': short_circuit_current
-        }
+        # One C loop per quantity instead of a Python call per point
+        v = np.asarray(voltages, dtype=np.float64)
+        i = np.asarray(currents, dtype=np.float64)
+        result = {}
+        
+        def wanted(key):
+            return fields is None or key in fields
+        
+        if wanted('resistances'):
+            # Zero current means infinite resistance, as in calculate_resistance
+            result['resistances'] = np.divide(v, i, out=np.full_like(v, np.inf), where=i != 0).tolist()
+        
+        if wanted('powers') or wanted('max_power') or wanted('max_power_voltage') or wanted('max_power_current'):
+            powers = v * i
+            max_power_idx = int(powers.argmax())
+            if wanted('powers'):
+                result['powers'] = powers.tolist()
+            if wanted('max_power'):
+                result['max_power'] = float(powers[max_power_idx])
+            if wanted('max_power_voltage'):
+                result['max_power_voltage'] = float(v[max_power_idx])
+            if wanted('max_power_current'):
+                result['max_power_current'] = float(i[max_power_idx])
+        
+        if wanted('open_circuit_voltage'):
+            # Estimate open circuit voltage (point closest to zero current)
+            zero_current_idx = int(np.abs(i).argmin()) if len(i) else 0
+            result['open_circuit_voltage'] = float(v[zero_current_idx])
+        
+        if wanted('short_circuit_current'):
+            # Estimate short circuit current (point closest to zero voltage)
+            zero_voltage_idx = int(np.abs(v).argmin()) if len(v) else 0
+            result['short_circuit_current'] = float(i[zero_voltage_idx])
+        
+        return result
+
+
+@dataclass(slots=True)
+class IVPoint:
+    """
+    One IV point with optical power, as returned by Optical.measure_iv_point().
+    
+    Fields are plain attributes; point['voltage'] style access still works for
+    code written against the earlier dictionary return value.
+    """
+    dac_value: int
+    voltage: float
+    current: float
+    power_electrical: float
+    power_optical_mw: float
+    power_optical_dbm: float
+    
+    def __getitem__(self, key: str):
+        return getattr(self, key)
+    
+    def as_dict(self) -> Dict:
+        """Return the point as a dictionary keyed by field name."""
+        return asdict(self)
 
 
 class Optical:
@@ -109,20 +180,53 @@ class Optical:
         self.adc = adc_controller
         self.opm = opm
         self.electrical = electrical or Electrical()
+        _enable_low_latency(self.dac, self.adc)
+        # Single worker so the OPM session is only ever touched from one thread;
+        # its reads overlap the ADC round-trip of the same point
+        self._opm_worker = ThreadPoolExecutor(max_workers=1)
+    
+    def close(self):
+        """Stop the OPM worker thread. The instruments stay open for their owners."""
+        self._opm_worker.shutdown(wait=True)
+    
+    def __enter__(self):
+        """Context manager entry."""
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """Context manager exit - stop the OPM worker thread."""
+        self.close()
     
     def measure_iv_point(self, dac_channel: int, adc_channel: int, 
                         dac_value: int, opm_channel: int = 1,
-                        delay: float = 0.1) -> Dict:
+                        delay: float = 0.1, ack: bool = True,
+                        read_opm: bool = True, settle_tol: Optional[float] = None) -> IVPoint:
         """
         Measure single IV point with optical power.
         
+        ack=False streams the DAC write without waiting for its reply (see
+        DACController.set_dac_pipelined); only valid when the ADC shares the
+        DAC's port, so the MCU applies the write before it answers the read.
+        Call dac.barrier() after the last point.
+        read_opm=False skips the power meter (optical fields are NaN).
+        With settle_tol (Volts) set, delay becomes an upper bound: the ADC is
+        polled and the point is taken as soon as two successive readings
+        differ by less than settle_tol (see _wait_settled).
+        
         Returns:
-            Dictionary with: dac_value, voltage, current, power_electrical,
+            IVPoint with: dac_value, voltage, current, power_electrical,
             power_optical_mw, power_optical_dbm
         """
         # Set DAC
-        self.dac.set_dac(dac_channel, dac_value, verbose=False)
-        time.sleep(delay)
+        self.dac.set_dac(dac_channel, dac_value, verbose=False, ack=ack)
+        if settle_tol is None:
+            time.sleep(delay)
+        else:
+            self._wait_settled(adc_channel, delay, settle_tol)
+        
+        # Both instruments now see the settled point: start the optical read
+        # (one read, in both units) in the background while the ADC is read
+        opm_future = self._opm_worker.submit(self.opm.get_power_both, opm_channel) if read_opm else None
         
         # Read voltage from ADC
         voltage = self.adc.read_voltage(adc_channel, verbose=False)
@@ -132,62 +236,137 @@ class Optical:
         # Calculate current
         current = self.electrical.calculate_current_from_shunt(voltage, adc_channel)
         
-        # Read optical power
-        power_optical_mw = self.opm.get_power_mw(opm_channel)
-        power_optical_dbm = self.opm.get_power(opm_channel)
+        power_optical_mw, power_optical_dbm = opm_future.result() if read_opm else (None, None)
         
         # Calculate electrical power
         power_electrical = self.electrical.calculate_power(voltage, current)
         
-        return {
-            'dac_value': dac_value,
-            'voltage': voltage,
-            'current': current,
-            'power_electrical': power_electrical,
-            'power_optical_mw': power_optical_mw if power_optical_mw is not None else float('nan'),
-            'power_optical_dbm': power_optical_dbm if power_optical_dbm is not None else float('nan')
-        }
+        return IVPoint(
+            dac_value,
+            voltage,
+            current,
+            power_electrical,
+            power_optical_mw if power_optical_mw is not None else float('nan'),
+            power_optical_dbm if power_optical_dbm is not None else float('nan')
+        )
+    
+    def _wait_settled(self, adc_channel: int, timeout: float, tol: float) -> bool:
+        """
+        Poll the ADC until two successive readings agree within tol Volts.
+        
+        The readings are one ADC round-trip apart, so a slow RC tail that moves
+        less than tol per round-trip also counts as settled; pick tol with that
+        in mind. Returns False if timeout passed first.
+        """
+        deadline = time.perf_counter() + timeout
+        prev = self.adc.read_voltage(adc_channel, verbose=False)
+        while time.perf_counter() < deadline:
+            voltage = self.adc.read_voltage(adc_channel, verbose=False)
+            if voltage is not None and prev is not None and abs(voltage - prev) < tol:
+                return True
+            prev = voltage
+        return False
     
     def sweep_iv_curve(self, dac_channel: int, adc_channel: int,
                        start_value: int, end_value: int, steps: int,
-                       opm_channel: int = 1, delay: float = 0.1) -> Dict:
+                       opm_channel: int = 1, delay: float = 0.1,
+                       progress_every: int = 10, verbose: bool = True,
+                       opm_logging: bool = False, settle_tol: Optional[float] = None) -> Dict:
         """
         Sweep DAC and measure IV curve with optical power.
         
+        Progress is printed for every progress_every-th step and the last one
+        (only the last if 0), as for the DACController sweeps; verbose=False
+        prints nothing and skips formatting the progress lines altogether.
+        
+        opm_logging=True replaces the power meter query per step with the
+        meter's logging function: it records one sample per step on its own
+        timebase and all of them are fetched in one block after the sweep.
+        The steps are then paced to the sample period, so sample i averages
+        step i including its settling time, and optical values are not known
+        (NaN) in the progress lines.
+        
+        settle_tol (Volts) ends each step's settle delay early once the ADC
+        reading is steady (see measure_iv_point); the first step always waits
+        the full delay. Not combined with opm_logging, whose steps have a fixed
+        period.
+        
         Returns:
             Dictionary with: dac_values, voltages, currents, powers_electrical,
             powers_optical_mw, powers_optical_dbm
         """
-        dac_values = []
-        voltages = []
-        currents = []
-        powers_electrical = []
-        powers_optical_mw = []
-        powers_optical_dbm = []
-        
         step_size = (end_value - start_value) / (steps - 1) if steps > 1 else 0
         
-        print(f"Sweeping DAC ch{dac_channel}, reading ADC ch{adc_channel}, OPM ch{opm_channel}...")
+        # The number of points is known up front: fill preallocated arrays
+        # (one row per step) instead of growing six lists
+        dac_values = (start_value + np.arange(steps) * step_size).astype(np.int32)
+        results = np.empty((steps, 5))
+        
+        # With one port for both, the MCU handles commands in order: the ADC read
+        # already follows the DAC write, so the write needs no round-trip of its own
+        ack = getattr(self.dac, 'ser', None) is None or getattr(self.adc, 'ser', None) is not self.dac.ser
+        
+        if verbose:
+            print(f"Sweeping DAC ch{dac_channel}, reading ADC ch{adc_channel}, OPM ch{opm_channel}...")
+        
+        if opm_logging:
+            # A step is the settle delay plus an ADC read; time one read and
+            # leave twice that as margin so no step overruns its sample
+            t = time.perf_counter()
+            self.adc.read_voltage(adc_channel, verbose=False)
+            period = delay + 2 * (time.perf_counter() - t)
+            opm_logging = self.opm.start_logging(opm_channel, steps, period)
+            if not opm_logging:
+                print("  Warning: OPM logging could not be started; reading the OPM at every step")
+            deadline = time.perf_counter()
+            overruns = 0
         
         for i in range(steps):
-            dac_value = int(start_value + i * step_size)
-            point = self.measure_iv_point(dac_channel, adc_channel, dac_value, 
-                                        opm_channel, delay)
+            point = self.measure_iv_point(dac_channel, adc_channel, int(dac_values[i]), 
+                                        opm_channel, delay, ack, read_opm=not opm_logging,
+                                        settle_tol=settle_tol if i > 0 and not opm_logging else None)
             
-            dac_values.append(point['dac_value'])
-            voltages.append(point['voltage'])
-            currents.append(point['current'])
-            powers_electrical.append(point['power_electrical'])
-            powers_optical_mw.append(point['power_optical_mw'])
-            powers_optical_dbm.append(point['power_optical_dbm'])
+            results[i] = (point.voltage, point.current, point.power_electrical,
+                          point.power_optical_mw, point.power_optical_dbm)
             
-            print(f"  Step {i+1}/{steps}: V={point['voltage']:.3f}V, "
-                  f"I={point['current']*1000:.3f}mA, "
-                  f"P_elec={point['power_electrical']*1000:.3f}mW, "
-                  f"P_opt={point['power_optical_mw']:.3f}mW")
+            if verbose and ((progress_every > 0 and i % progress_every == 0) or i == steps - 1):
+                print(f"  Step {i+1}/{steps}: V={point.voltage:.3f}V, "
+                      f"I={point.current*1000:.3f}mA, "
+                      f"P_elec={point.power_electrical*1000:.3f}mW, "
+                      f"P_opt={point.power_optical_mw:.3f}mW")
+            
+            if opm_logging:
+                # Keep the steps on the meter's sample grid; a step that ran
+                # past its sample leaves the later steps out of line with it
+                deadline += period
+                remaining = deadline - time.perf_counter()
+                if remaining < 0:
+                    overruns += 1
+                else:
+                    time.sleep(remaining)
+        
+        if not ack:
+            # Collect failed DAC writes from the pipelined commands
+            success, _ = self.dac.barrier()
+            if not success:
+                print("  Warning: MCU reported failed DAC writes during the sweep")
+        
+        if opm_logging:
+            samples = self.opm.fetch_logging(opm_channel)
+            if overruns:
+                print(f"  Warning: {overruns} step(s) overran the OPM sample period ({period*1000:.1f} ms); "
+                      f"logged optical powers don't line up with the steps and are left as NaN")
+            elif samples is not None and len(samples) >= steps:
+                mw = np.asarray(samples[:steps], dtype=np.float64) * 1000
+                results[:, 3] = mw
+                results[:, 4] = 10 * np.log10(mw, out=np.full_like(mw, np.nan), where=mw > 0)
+            else:
+                print("  Warning: OPM logging returned no data; optical powers are NaN")
+        
+        voltages, currents, powers_electrical, powers_optical_mw, powers_optical_dbm = results.T.tolist()
         
         return {
-            'dac_values': dac_values,
+            'dac_values': dac_values.tolist(),
             'voltages': voltages,
             'currents': currents,
             'powers_electrical': powers_electrical,
@@ -217,13 +396,25 @@ class DataHandler:
         keys = list(data.keys())
         max_len = max(len(data[k]) for k in keys) if keys else 0
         
+        # Equal-length numeric columns (the usual case) go into one array, so
+        # np.savetxt formats the rows in C instead of a Python loop per row.
+        # Anything else (short columns, None, text) keeps the empty cells below.
+        table = None
+        if keys and all(len(data[k]) == max_len for k in keys):
+            columns = [np.asarray(data[k]) for k in keys]
+            if all(c.ndim == 1 and c.dtype.kind in 'iuf' for c in columns):
+                table = np.column_stack(columns).astype(np.float64, copy=False)
+        
         with open(filename, 'w', newline='') as csvfile:
             writer = csv.writer(csvfile)
             writer.writerow(keys)  # Header
             
-            for i in range(max_len):
-                row = [data[k][i] if i < len(data[k]) else '' for k in keys]
-                writer.writerow(row)
+            if table is not None:
+                np.savetxt(csvfile, table, fmt='%.10g', delimiter=',', newline='\r\n')
+            else:
+                for i in range(max_len):
+                    row = [data[k][i] if i < len(data[k]) else '' for k in keys]
+                    writer.writerow(row)
         
         print(f"Data saved to {filename}")
     
@@ -239,19 +430,33 @@ class DataHandler:
             raise FileNotFoundError(f"File {filename} not found")
         
         data = {}
-        with open(filename, 'r') as csvfile:
-            reader = csv.reader(csvfile)
-            header = next(reader)
-            
-            for col in header:
-                data[col] = []
-            
-            for row in reader:
+        with open(filename, 'r', newline='') as csvfile:
+            lines = csvfile.read().splitlines()
+        header = next(csv.reader(lines[:1]))
+        rows = lines[1:]
+        
+        # Fully numeric files (as save_to_csv writes them) are parsed in C in
+        # one call; anything np.loadtxt rejects (empty or text cells, short
+        # rows) falls back to converting cell by cell
+        if any(rows):
+            try:
+                table = np.loadtxt(rows, delimiter=',', dtype=np.float64, ndmin=2)
+            except ValueError:
+                table = None
+            if table is not None and table.shape[1] == len(header):
                 for i, col in enumerate(header):
-                    try:
-                        data[col].append(float(row[i]))
-                    except (ValueError, IndexError):
-                        data[col].append(float('nan'))
+                    data[col] = table[:, i].tolist()
+                return data
+        
+        for col in header:
+            data[col] = []
+        
+        for row in csv.reader(rows):
+            for i, col in enumerate(header):
+                try:
+                    data[col].append(float(row[i]))
+                except (ValueError, IndexError):
+                    data[col].append(float('nan'))
         
         return data
     
@@ -267,11 +472,26 @@ class Plotter:
     Class for plotting IV curves and related data.
     """
     
-    @staticmethod
-    def plot_iv_curve(voltages: List[float], currents: List[float],
+    # Figure, axes and line reused by plot_iv_curve(live=True)
+    _fig = None
+    _ax = None
+    _line = None
+    
+    @classmethod
+    def plot_iv_curve(cls, voltages: List[float], currents: List[float],
                       title: str = "IV Curve", save_path: Optional[str] = None,
-                      show_plot: bool = True) -> None:
-        """Plot IV curve (voltage vs current)."""
+                      show_plot: bool = True, live: bool = False) -> None:
+        """
+        Plot IV curve (voltage vs current).
+        
+        live=True keeps one figure open and only replaces the line's data on
+        later calls, for redrawing a sweep in progress without rebuilding the
+        figure each time.
+        """
+        if live:
+            cls._update_live(voltages, currents, title, save_path, show_plot)
+            return
+        
         plt.figure(figsize=(10, 6))
         plt.plot(voltages, currents, 'b-', linewidth=2, marker='o', markersize=4)
         plt.xlabel('Voltage (V)', fontsize=12)
@@ -289,6 +509,31 @@ class Plotter:
         else:
             plt.close()
     
+    @classmethod
+    def _update_live(cls, voltages, currents, title, save_path, show_plot):
+        """Create the live IV figure on first use (or after it was closed), else update its line."""
+        if cls._fig is None or not plt.fignum_exists(cls._fig.number):
+            cls._fig, cls._ax = plt.subplots(figsize=(10, 6))
+            cls._line, = cls._ax.plot(voltages, currents, 'b-', linewidth=2, marker='o', markersize=4)
+            cls._ax.set_xlabel('Voltage (V)', fontsize=12)
+            cls._ax.set_ylabel('Current (A)', fontsize=12)
+            cls._ax.grid(True, alpha=0.3)
+            cls._fig.tight_layout()
+            if show_plot:
+                plt.show(block=False)
+        else:
+            cls._line.set_data(voltages, currents)
+            cls._ax.relim()
+            cls._ax.autoscale_view()
+        cls._ax.set_title(title, fontsize=14, fontweight='bold')
+        
+        if save_path:
+            cls._fig.savefig(save_path, dpi=300, bbox_inches='tight')
+            print(f"Plot saved to {save_path}")
+        
+        cls._fig.canvas.draw_idle()
+        cls._fig.canvas.flush_events()
+    
     @staticmethod
     def plot_power_curve(voltages: List[float], powers: List[float],
                         title: str = "Power Curve", save_path: Optional[str] = None,
@@ -328,9 +573,9 @@ class Plotter:
         plt.plot(voltages, powers_optical, 'g-', linewidth=2, marker='o',
                 markersize=4, label='Optical Power (mW)')
         
-        if powers_electrical:
-            # Convert to mW for comparison
-            powers_electrical_mw = [p * 1000 for p in powers_electrical]
+        if powers_electrical is not None and len(powers_electrical):
+            # Convert to mW for comparison (one vectorized multiply; lists work too)
+            powers_electrical_mw = np.multiply(powers_electrical, 1000.0)
             plt.plot(voltages, powers_electrical_mw, 'r--', linewidth=2,
                     marker='s', markersize=4, label='Electrical Power (mW)')
         
@@ -360,14 +605,13 @@ class Plotter:
         if x_col not in data or y_col not in data:
             raise ValueError(f"Columns '{x_col}' or '{y_col}' not found in CSV")
         
-        x_data = data[x_col]
-        y_data = data[y_col]
+        x_data = np.asarray(data[x_col], dtype=np.float64)
+        y_data = np.asarray(data[y_col], dtype=np.float64)
         
-        # Remove NaN values
-        valid_indices = [i for i in range(len(x_data))
-                        if not (np.isnan(x_data[i]) or np.isnan(y_data[i]))]
-        x_data = [x_data[i] for i in valid_indices]
-        y_data = [y_data[i] for i in valid_indices]
+        # Remove NaN values (one boolean mask over both columns)
+        valid = ~(np.isnan(x_data) | np.isnan(y_data))
+        x_data = x_data[valid]
+        y_data = y_data[valid]
         
         if title is None:
             title = f"{y_col} vs {x_col}"
@@ -407,28 +651,28 @@ def quick_iv_sweep(dac_controller, adc_controller, dac_channel: int, adc_channel
         Dictionary with: voltages, currents, and analysis results
     """
     elec = Electrical(shunt_resistors or [1.0, 1.0, 1.0, 1.0])
-    
-    voltages = []
-    currents = []
+    _enable_low_latency(dac_controller, adc_controller)
     
     step_size = (end_value - start_value) / (steps - 1) if steps > 1 else 0
+    dac_values = (start_value + np.arange(steps) * step_size).astype(np.int32).tolist()
     
-    for i in range(steps):
-        dac_value = int(start_value + i * step_size)
+    voltages = np.empty(steps)
+    
+    for i, dac_value in enumerate(dac_values):
         dac_controller.set_dac(dac_channel, dac_value, verbose=False)
         time.sleep(0.1)
         
-        voltage = adc_controller.read_voltage(adc_channel, verbose=False) or 0.0
-        current = elec.calculate_current_from_shunt(voltage, adc_channel)
-        
-        voltages.append(voltage)
-        currents.append(current)
+        voltages[i] = adc_controller.read_voltage(adc_channel, verbose=False) or 0.0
+    
+    # Currents for the whole sweep in one division
+    currents = elec.calculate_currents_from_shunt(voltages, adc_channel)
     
+    # Analyze the arrays directly; lists are only built for the returned data
     analysis = elec.analyze_iv_curve(voltages, currents)
     
     return {
-        'voltages': voltages,
-        'currents': currents,
+        'voltages': voltages.tolist(),
+        'currents': currents.tolist(),
         **analysis
     }
         
\ No newline at end of file